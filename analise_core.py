@@ -0,0 +1,564 @@
+# analise_core.py
+# -*- coding: utf-8 -*-
+"""
+Núcleo comum das análises de frequência dos dados CNJ de Saúde.
+
+Reúne o parse das colunas multi-valoradas ('{Val1, Val2, ...}'), a leitura do CSV
+em chunks (PyArrow ou pandas), o filtro opcional de linhas por palavras-chave e a
+contagem dos itens. `analise_output.py` (todos os processos) e
+`analise_output_sus.py` (apenas entes públicos no polo passivo) chamam `analisar`
+com parâmetros diferentes.
+
+O filtro é declarativo (coluna + palavras-chave) em vez de uma função: assim ele
+pode ser aplicado direto no RecordBatch Arrow e os argumentos continuam
+serializáveis para o ProcessPoolExecutor e para a chave do cache em disco.
+"""
+
+import pandas as pd
+from pathlib import Path
+import logging
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+import shutil
+import tempfile
+import threading
+import queue
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Leitura de CSV via PyArrow (multi-thread), quando disponível
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pc
+    import pyarrow.dataset as pa_ds
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+# Filtro por palavras-chave com Aho-Corasick (pyahocorasick), opcional - usado no caminho pandas
+try:
+    import ahocorasick
+    AHOCORASICK_DISPONIVEL = True
+except ImportError:
+    AHOCORASICK_DISPONIVEL = False
+
+# Kernel de contagem compilado (Numba), opcional
+try:
+    from numba import njit
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
+
+CHUNKSIZE_PADRAO = 100000
+MAX_WORKERS_ANALISE = max(1, (os.cpu_count() or 2) // 2) # Processos por pool (metade dos núcleos: cada um já usa o leitor Arrow multi-thread e o prefetch)
+
+# --- Parse das Colunas Multi-valoradas ---
+
+# Expressões regulares pré-compiladas (usadas em todas as células)
+_SPLIT_RE = re.compile(r'\s*,\s*') # Separador de valores, tolerando espaços extras
+_BRACE_RE = re.compile(r'^\{|\}$') # Chaves de abertura/fechamento da célula
+
+def parse_multi_valor(valor_celula: str | float) -> list[str]:
+    """Extrai valores individuais de uma célula ('{Val1, Val2, ...}')."""
+    if pd.isna(valor_celula): return []
+    texto = _BRACE_RE.sub('', str(valor_celula).strip()).strip()
+    # Itens vazios (vírgulas duplas) são descartados
+    return [item for item in _SPLIT_RE.split(texto) if item]
+
+
+def parse_series(serie: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de parse_multi_valor para uma coluna inteira.
+
+    Retorna uma Series com um item por linha (índice original repetido),
+    já sem valores nulos ou vazios.
+    """
+    itens = (
+        serie.dropna().astype(str).str.strip()
+        .str.removeprefix('{').str.removesuffix('}')
+        .str.split(_SPLIT_RE.pattern, regex=True)
+        .explode()
+        .str.strip()
+    )
+    return itens[itens.notna() & itens.ne('')]
+
+
+@lru_cache(maxsize=None)
+def compilar_padrao_palavras(palavras_chave: frozenset) -> re.Pattern:
+    """Compila as palavras-chave em uma única alternação (mais longas primeiro)."""
+    return re.compile('|'.join(sorted(map(re.escape, palavras_chave), key=len, reverse=True)))
+
+
+@lru_cache(maxsize=None)
+def _montar_automato(palavras_chave: frozenset):
+    """Monta o autômato Aho-Corasick das palavras-chave (uma passada linear por texto)."""
+    automato = ahocorasick.Automaton()
+    for palavra in palavras_chave:
+        automato.add_word(palavra, palavra)
+    automato.make_automaton()
+    return automato
+
+
+def mascara_palavras(serie: pd.Series, palavras_chave: frozenset) -> pd.Series:
+    """Máscara booleana: True onde a célula (em maiúsculas) contém alguma das palavras-chave."""
+    if AHOCORASICK_DISPONIVEL:
+        automato = _montar_automato(palavras_chave)
+        return pd.Series(
+            [next(automato.iter(texto.upper()), None) is not None for texto in serie.fillna('').tolist()],
+            index=serie.index, dtype=bool
+        )
+    return serie.fillna('').str.upper().str.contains(compilar_padrao_palavras(palavras_chave).pattern, regex=True)
+
+
+# --- Leitura do CSV ---
+
+def _ler_batches_arrow(caminho_csv: Path, colunas: list, coluna_filtro: str | None = None, palavras_filtro: frozenset | None = None):
+    """
+    Itera pares (linhas_lidas, RecordBatch) do CSV (apenas `colunas`, como texto) no leitor
+    em streaming do PyArrow.
+
+    O arquivo é mapeado em memória (mmap): o Arrow lê direto do page cache, sem a
+    cópia intermediária para buffers do Python. Com `coluna_filtro`, mantém apenas as
+    linhas cuja coluna (em maiúsculas) contém alguma das `palavras_filtro`, ANTES da
+    conversão para pandas.
+    """
+    # Padrão passado como texto: o RE2 do pyarrow.compute aceita a saída de re.escape
+    padrao_filtro = compilar_padrao_palavras(palavras_filtro).pattern if coluna_filtro is not None else None
+    with pa.memory_map(str(caminho_csv), 'r') as fonte:
+        leitor = pa_csv.open_csv(
+            fonte,
+            read_options=pa_csv.ReadOptions(block_size=64 << 20),
+            parse_options=pa_csv.ParseOptions(delimiter=';'),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=colunas,
+                column_types={col: pa.string() for col in colunas},
+                strings_can_be_null=True # Células vazias viram nulo, como no pandas
+            )
+        )
+        for batch in leitor:
+            if coluna_filtro is None:
+                yield batch.num_rows, batch
+                continue
+            mascara = pc.fill_null(pc.match_substring_regex(pc.utf8_upper(batch.column(coluna_filtro)), padrao_filtro), False)
+            yield batch.num_rows, batch.filter(mascara)
+
+
+def ler_csv_em_chunks(caminho_csv: Path, colunas: list, chunksize: int, coluna_filtro: str | None = None, palavras_filtro: frozenset | None = None):
+    """
+    Itera o CSV em pares (linhas_lidas, chunk) com DataFrames de até `chunksize` linhas,
+    lendo apenas `colunas` como texto e, se `coluna_filtro` for informada, mantendo apenas
+    as linhas em que ela (em maiúsculas) contém alguma das `palavras_filtro`.
+
+    Com PyArrow disponível usa o leitor em streaming do Arrow (tokenização multi-thread,
+    filtro aplicado no RecordBatch); caso contrário, recorre ao pd.read_csv em chunks e
+    filtra com mascara_palavras (Aho-Corasick, se disponível, ou Series.str.contains).
+    """
+    if PYARROW_DISPONIVEL:
+        for linhas_lidas, batch in _ler_batches_arrow(caminho_csv, colunas, coluna_filtro, palavras_filtro):
+            for inicio in range(0, max(batch.num_rows, 1), chunksize):
+                yield linhas_lidas, batch.slice(inicio, chunksize).to_pandas(types_mapper=pd.ArrowDtype)
+                linhas_lidas = 0 # Linhas do batch já contabilizadas no primeiro pedaço
+        return
+
+    # Buffer de 1 MiB (menos syscalls que o padrão de 8 KiB); bytes UTF-8 inválidos viram U+FFFD
+    with open(caminho_csv, 'rb', buffering=1 << 20) as arquivo:
+        iterador_csv = pd.read_csv(
+            arquivo,
+            sep=';',
+            encoding='utf-8',
+            encoding_errors='replace',
+            dtype={col: 'str' for col in colunas},
+            chunksize=chunksize,
+            usecols=colunas # Com dtype fixo por coluna não há inferência de tipos a proteger (sem low_memory=False)
+        )
+        for chunk in iterador_csv:
+            if coluna_filtro is None:
+                yield len(chunk), chunk
+                continue
+            yield len(chunk), chunk[mascara_palavras(chunk[coluna_filtro], palavras_filtro)]
+
+
+_FIM_PREFETCH = object() # Sentinela de fim do iterador em prefetch
+
+def prefetch(iteravel, n: int = 1):
+    """
+    Itera `iteravel` com até `n` itens lidos antecipadamente por uma thread em segundo plano.
+
+    Sobrepõe a leitura/tokenização do próximo chunk (C, libera o GIL) ao processamento
+    do chunk atual. Exceções da leitura são relançadas no consumidor. Se o consumidor
+    parar antes do fim (exceção ou close()), a thread é encerrada e liberada.
+    """
+    fila = queue.Queue(maxsize=n)
+    parar = threading.Event()
+
+    def colocar(item) -> bool:
+        while not parar.is_set(): # Timeout para não travar se o consumidor desistir
+            try: fila.put(item, timeout=0.1); return True
+            except queue.Full: continue
+        return False
+
+    def produtor():
+        try:
+            for item in iteravel:
+                if not colocar(item): return
+            colocar((_FIM_PREFETCH, None))
+        except BaseException as e:
+            colocar((_FIM_PREFETCH, e))
+        finally:
+            if hasattr(iteravel, 'close'): iteravel.close() # Gerador interrompido: fecha arquivo/mmap já na thread
+
+    thread = threading.Thread(target=produtor, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = fila.get()
+            if isinstance(item, tuple) and len(item) == 2 and item[0] is _FIM_PREFETCH:
+                if item[1] is not None: raise item[1]
+                return
+            yield item
+    finally:
+        parar.set(); thread.join()
+
+
+# --- Contagem Compilada (Numba) ---
+
+if NUMBA_DISPONIVEL:
+    @njit(cache=True)
+    def _tamanho_espaco(dados, pos, fim):
+        """
+        Tamanho em bytes do caractere de espaço (str.isspace) codificado em UTF-8 a partir de `pos`,
+        ou 0 se não for espaço. Cobre os mesmos caracteres que str.strip e o \\s do parse_series.
+        """
+        b0 = dados[pos]
+        if b0 == 32 or (9 <= b0 <= 13) or (28 <= b0 <= 31): return 1 # ' ', \t-\r, separadores \x1c-\x1f
+        if b0 == 0xC2:
+            if pos + 1 < fim and (dados[pos + 1] == 0x85 or dados[pos + 1] == 0xA0): return 2 # NEL, NBSP
+            return 0
+        if pos + 2 >= fim or dados[pos + 1] < 0x80: return 0
+        b1 = dados[pos + 1]; b2 = dados[pos + 2]
+        if b0 == 0xE1: return 3 if b1 == 0x9A and b2 == 0x80 else 0 # U+1680
+        if b0 == 0xE3: return 3 if b1 == 0x80 and b2 == 0x80 else 0 # U+3000
+        if b0 == 0xE2:
+            if b1 == 0x80 and (0x80 <= b2 <= 0x8A or b2 == 0xA8 or b2 == 0xA9 or b2 == 0xAF): return 3 # U+2000-200A, 2028, 2029, 202F
+            if b1 == 0x81 and b2 == 0x9F: return 3 # U+205F
+        return 0
+
+    @njit(cache=True)
+    def _espaco_no_fim(dados, ini, fim):
+        """Tamanho em bytes do caractere de espaço que termina em `fim` (0 se não houver)."""
+        for tamanho in range(1, 4):
+            if fim - tamanho < ini: break
+            if _tamanho_espaco(dados, fim - tamanho, fim) == tamanho: return tamanho
+        return 0
+
+    @njit(cache=True)
+    def _aparar(dados, ini, fim):
+        """Equivalente a str.strip() sobre os bytes UTF-8 dados[ini:fim]; retorna os novos limites."""
+        while ini < fim:
+            n = _tamanho_espaco(dados, ini, fim)
+            if n == 0: break
+            ini += n
+        while fim > ini:
+            n = _espaco_no_fim(dados, ini, fim)
+            if n == 0: break
+            fim -= n
+        return ini, fim
+
+    @njit(cache=True)
+    def _contar_tokens_kernel(dados, offsets):
+        """
+        Conta os itens de todas as células de uma coluna Arrow (bytes + offsets).
+
+        Reproduz parse_multi_valor (strip com os espaços Unicode do str.strip, remove '{' e '}',
+        separa por vírgula, descarta vazios) e acumula as contagens em uma tabela hash de endereçamento aberto (FNV-1a),
+        sem criar objetos Python por item. Retorna (inicio, tamanho, contagem) de cada
+        item único, com as posições referentes a `dados`.
+        """
+        capacidade = 1024
+        hashes = np.zeros(capacidade, np.uint64)
+        inicios = np.full(capacidade, -1, np.int64)
+        tamanhos = np.zeros(capacidade, np.int64)
+        contagens = np.zeros(capacidade, np.int64)
+        ocupados = 0
+        for linha in range(offsets.shape[0] - 1):
+            ini = np.int64(offsets[linha]); fim = np.int64(offsets[linha + 1])
+            ini, fim = _aparar(dados, ini, fim)
+            if ini < fim and dados[ini] == 123: ini += 1 # '{'
+            if fim > ini and dados[fim - 1] == 125: fim -= 1 # '}'
+            inicio_item = ini
+            for pos in range(ini, fim + 1):
+                if pos < fim and dados[pos] != 44: continue # ','
+                a = inicio_item; b = pos
+                inicio_item = pos + 1
+                a, b = _aparar(dados, a, b)
+                if a == b: continue
+                h = np.uint64(14695981039346656037)
+                for k in range(a, b):
+                    h = (h ^ np.uint64(dados[k])) * np.uint64(1099511628211)
+                slot = np.int64(h & np.uint64(capacidade - 1))
+                while True:
+                    if inicios[slot] == -1:
+                        hashes[slot] = h; inicios[slot] = a; tamanhos[slot] = b - a; contagens[slot] = 1
+                        ocupados += 1
+                        break
+                    if hashes[slot] == h and tamanhos[slot] == b - a:
+                        igual = True
+                        for k in range(b - a):
+                            if dados[inicios[slot] + k] != dados[a + k]:
+                                igual = False; break
+                        if igual:
+                            contagens[slot] += 1
+                            break
+                    slot = (slot + 1) & (capacidade - 1)
+                if 2 * ocupados > capacidade: # Mantém fator de carga <= 0.5 dobrando a tabela
+                    nova_capacidade = capacidade * 2
+                    novos_hashes = np.zeros(nova_capacidade, np.uint64)
+                    novos_inicios = np.full(nova_capacidade, -1, np.int64)
+                    novos_tamanhos = np.zeros(nova_capacidade, np.int64)
+                    novas_contagens = np.zeros(nova_capacidade, np.int64)
+                    for j in range(capacidade):
+                        if inicios[j] == -1: continue
+                        novo_slot = np.int64(hashes[j] & np.uint64(nova_capacidade - 1))
+                        while novos_inicios[novo_slot] != -1:
+                            novo_slot = (novo_slot + 1) & (nova_capacidade - 1)
+                        novos_hashes[novo_slot] = hashes[j]; novos_inicios[novo_slot] = inicios[j]
+                        novos_tamanhos[novo_slot] = tamanhos[j]; novas_contagens[novo_slot] = contagens[j]
+                    capacidade = nova_capacidade
+                    hashes = novos_hashes; inicios = novos_inicios; tamanhos = novos_tamanhos; contagens = novas_contagens
+        usados = inicios != -1
+        return inicios[usados], tamanhos[usados], contagens[usados]
+
+    @njit(cache=True)
+    def _somar_por_id(ids, pesos, totais):
+        """Soma cada peso na posição do seu id (ids repetidos acumulam)."""
+        for k in range(ids.shape[0]):
+            totais[ids[k]] += pesos[k]
+
+
+def _contar_coluna_arrow(coluna_arrow) -> pd.Series:
+    """Conta os itens de uma coluna Arrow com o kernel Numba (decodifica apenas os itens únicos)."""
+    arr = pc.fill_null(coluna_arrow, '')
+    _, buf_offsets, buf_dados = arr.buffers()
+    if buf_dados is None: return pd.Series(dtype='int64') # Coluna sem nenhum texto neste bloco
+    offsets = np.frombuffer(buf_offsets, dtype=np.int32)[arr.offset:arr.offset + len(arr) + 1]
+    dados = np.frombuffer(buf_dados, dtype=np.uint8)
+    inicios, tamanhos, contagens = _contar_tokens_kernel(dados, offsets)
+    return pd.Series(
+        contagens,
+        index=[dados[ini:ini + tam].tobytes().decode('utf-8') for ini, tam in zip(inicios, tamanhos)],
+        dtype='int64'
+    )
+
+
+def acumular_por_id(tabela_ids: dict, totais: np.ndarray, itens, pesos: np.ndarray) -> np.ndarray:
+    """
+    Soma `pesos` em `totais` pelo id inteiro de cada item (tabela_ids: texto -> id, por ordem de chegada).
+
+    Os textos são internados uma vez; a soma roda no kernel Numba (ou np.add.at sem ele).
+    Retorna `totais`, realocado por duplicação quando surgem ids novos além da capacidade.
+    """
+    definir_id = tabela_ids.setdefault
+    ids = np.fromiter((definir_id(item, len(tabela_ids)) for item in itens), dtype=np.int64, count=len(itens))
+    if len(tabela_ids) > len(totais):
+        novos_totais = np.zeros(max(2 * len(totais), len(tabela_ids)), dtype=np.int64)
+        novos_totais[:len(totais)] = totais; totais = novos_totais
+    if NUMBA_DISPONIVEL: _somar_por_id(ids, np.asarray(pesos, dtype=np.int64), totais)
+    else: np.add.at(totais, ids, pesos)
+    return totais
+
+
+def contador_de_ids(tabela_ids: dict, totais: np.ndarray) -> dict:
+    """Converte (tabela_ids, totais) de volta em {texto: contagem}, sem os itens zerados."""
+    return {item: contagem for item, contagem in zip(tabela_ids, totais[:len(tabela_ids)].tolist()) if contagem}
+
+
+# --- Análise ---
+
+def _separar_sigiloso(contagem_chunk: pd.Series, separar_sigiloso: bool) -> tuple[pd.Series, int]:
+    """
+    Descarta contagens zeradas e, com `separar_sigiloso`, retira os itens 'SIGILOSO',
+    retornando sua soma à parte (o upper é feito apenas nos itens únicos).
+    """
+    contagem_chunk = contagem_chunk[contagem_chunk > 0]
+    if not separar_sigiloso:
+        return contagem_chunk, 0
+    mascara_sigiloso = contagem_chunk.index.astype(str).str.upper() == 'SIGILOSO'
+    return contagem_chunk[~mascara_sigiloso], int(contagem_chunk[mascara_sigiloso].sum())
+
+
+def _registrar_parciais(parciais: dict, contadores: dict, pasta_parciais: Path | None, indice: int):
+    """
+    Acumula as contagens de um chunk ({coluna: Series}, um valor por item único).
+
+    Sem `pasta_parciais`, faz o merge nos Counters em memória. Com ela, grava o chunk
+    em um Parquet (coluna, item, contagem) e não guarda nada em RAM.
+    """
+    if pasta_parciais is None:
+        for coluna, contagem in parciais.items():
+            contadores[coluna].update(contagem.to_dict())
+        return
+    if not parciais: return
+    pq.write_table(pa.table({
+        'coluna': pa.array([coluna for coluna, contagem in parciais.items() for _ in range(len(contagem))], pa.string()),
+        'item': pa.array([item for contagem in parciais.values() for item in contagem.index.astype(str)], pa.string()),
+        'contagem': pa.array(np.concatenate([contagem.to_numpy(dtype='int64') for contagem in parciais.values()]), pa.int64())
+    }), pasta_parciais / f"parcial_{indice:06d}.parquet")
+
+
+def _reduzir_parciais(pasta_parciais: Path) -> dict:
+    """Soma os Parquets parciais (group by coluna + item) e retorna {coluna: Series decrescente}."""
+    if not any(pasta_parciais.iterdir()): return {}
+    totais = (
+        pa_ds.dataset(pasta_parciais, format='parquet').to_table()
+        .group_by(['coluna', 'item']).aggregate([('contagem', 'sum')])
+        .to_pandas()
+    )
+    return {
+        coluna: grupo.sort_values('contagem_sum', ascending=False, kind='stable').set_index('item')['contagem_sum'].rename_axis(None).rename(None)
+        for coluna, grupo in totais.groupby('coluna', sort=False)
+    }
+
+
+def _series_do_contador(contador: Counter) -> pd.Series:
+    """Converte o Counter em Series decrescente."""
+    itens_ordenados = contador.most_common() # Ordenação decrescente feita pelo Counter (em C)
+    return pd.Series(
+        [contagem for _, contagem in itens_ordenados],
+        index=[item for item, _ in itens_ordenados],
+        dtype='int64'
+    )
+
+
+def analisar(
+    caminho_csv: Path,
+    colunas: list,
+    coluna_filtro: str | None = None,
+    palavras_filtro: set | None = None,
+    separar_sigiloso: bool = False,
+    usar_kernel_numba: bool = False,
+    chunksize: int = CHUNKSIZE_PADRAO,
+    spill_em_disco: bool = False
+) -> dict | None:
+    """
+    Lê um arquivo CSV e calcula a frequência COMPLETA dos itens das colunas especificadas.
+
+    Args:
+        caminho_csv: Path do arquivo CSV a ser analisado.
+        colunas: Lista de nomes das colunas a analisar.
+        coluna_filtro: Se informada, considera apenas as linhas em que esta coluna
+            (em maiúsculas) contém alguma das `palavras_filtro`.
+        palavras_filtro: Palavras-chave (em maiúsculas) do filtro de linhas.
+        separar_sigiloso: Conta os itens 'SIGILOSO' à parte ('contagem_sigiloso'),
+            fora das contagens, mas incluídos em 'total_ocorrencias'.
+        usar_kernel_numba: Conta via kernel Numba sobre os buffers Arrow (requer numba e
+            pyarrow; indicado para arquivos grandes). Sem eles, usa o caminho pandas.
+        chunksize: Linhas por chunk no caminho pandas.
+        spill_em_disco: Grava as contagens de cada chunk em Parquet temporário e soma tudo
+            no final (pyarrow.dataset), em vez de manter os Counters em memória. Mantém a
+            RAM estável mesmo com milhões de itens únicos (requer pyarrow).
+
+    Returns:
+        Dicionário onde cada chave é uma coluna existente no arquivo e o valor é outro
+        dicionário contendo: {'contagens': pd.Series (todas contagens), 'total_ocorrencias': int}
+        (mais 'contagem_sigiloso': int, se `separar_sigiloso`).
+        Retorna None em caso de erro na leitura do arquivo.
+    """
+    if coluna_filtro is None:
+        logger.info(f"Analisando frequências em: {caminho_csv.name}")
+    else:
+        logger.info(f"Analisando (com filtro em '{coluna_filtro}'): {caminho_csv.name}")
+    if not caminho_csv.exists():
+        logger.error(f"Arquivo não encontrado: {caminho_csv}")
+        return None
+
+    pasta_parciais = None
+    try:
+        # Verifica as colunas realmente presentes no arquivo antes de ler tudo
+        try:
+            colunas_presentes = pd.read_csv(caminho_csv, sep=';', encoding='utf-8', nrows=0).columns.tolist() # Apenas cabeçalho
+        except Exception as peek_err:
+            logger.error(f"Erro ao verificar cabeçalho de {caminho_csv.name}: {peek_err}. Pulando análise.")
+            return None
+        colunas_existentes = [col for col in colunas if col in colunas_presentes]
+        if len(colunas_existentes) < len(colunas):
+            logger.warning(f"Colunas de análise não encontradas em {caminho_csv.name}: {set(colunas) - set(colunas_presentes)}. Analisando apenas as existentes.")
+        if not colunas_existentes or (coluna_filtro is not None and coluna_filtro not in colunas_presentes):
+            logger.error(f"Colunas essenciais não encontradas em {caminho_csv.name}. Pulando análise.")
+            return None
+
+        colunas_leitura = colunas_existentes + ([coluna_filtro] if coluna_filtro is not None and coluna_filtro not in colunas_existentes else [])
+        palavras_filtro = frozenset(palavras_filtro) if coluna_filtro is not None else None # Hashable (caches lru)
+
+        contadores = {col: Counter() for col in colunas_existentes}
+        contagem_sigiloso = {col: 0 for col in colunas_existentes}
+        linhas_lidas_total = 0
+        linhas_filtradas_total = 0
+        pasta_parciais = Path(tempfile.mkdtemp(prefix='cnj_contagens_')) if spill_em_disco and PYARROW_DISPONIVEL else None
+
+        if usar_kernel_numba and NUMBA_DISPONIVEL and PYARROW_DISPONIVEL:
+            logger.info(f"Contando itens de {caminho_csv.name} com o kernel Numba.")
+            for i, (linhas_lidas, batch) in enumerate(_ler_batches_arrow(caminho_csv, colunas_leitura, coluna_filtro, palavras_filtro)):
+                linhas_lidas_total += linhas_lidas
+                linhas_filtradas_total += batch.num_rows
+                parciais = {}
+                for coluna in colunas_existentes:
+                    parciais[coluna], sigilosos = _separar_sigiloso(_contar_coluna_arrow(batch.column(coluna)), separar_sigiloso)
+                    contagem_sigiloso[coluna] += sigilosos
+                _registrar_parciais(parciais, contadores, pasta_parciais, i)
+        else:
+            iterador_csv = ler_csv_em_chunks(caminho_csv, colunas_leitura, chunksize, coluna_filtro, palavras_filtro)
+            for i, (linhas_lidas, chunk) in enumerate(iterador_csv):
+                logger.debug(f"Processando chunk de análise {i+1}...")
+                linhas_lidas_total += linhas_lidas
+                linhas_filtradas_total += len(chunk)
+                parciais = {}
+                for coluna in colunas_existentes:
+                    # Parse vetorizado (strip, remove chaves, split e explode em C)
+                    itens = parse_series(chunk[coluna])
+                    if itens.empty: continue
+                    # Categórico: itens repetidos viram códigos inteiros e a contagem é um histograma.
+                    # O merge no Counter itera apenas itens únicos.
+                    parciais[coluna], sigilosos = _separar_sigiloso(itens.astype('category').value_counts(), separar_sigiloso)
+                    contagem_sigiloso[coluna] += sigilosos
+                _registrar_parciais(parciais, contadores, pasta_parciais, i)
+
+        if pasta_parciais is None:
+            contagens_por_coluna = {coluna: _series_do_contador(contadores[coluna]) for coluna in colunas_existentes}
+        else:
+            contagens_por_coluna = _reduzir_parciais(pasta_parciais)
+
+        if coluna_filtro is None:
+            logger.info(f"Análise de {caminho_csv.name} concluída. Total de linhas lidas: {linhas_lidas_total}")
+        else:
+            logger.info(f"Análise de {caminho_csv.name} concluída. Lidas: {linhas_lidas_total}, Após o filtro: {linhas_filtradas_total}")
+
+        # Processa os resultados finais
+        resultados_finais = {}
+        for coluna in colunas_existentes:
+            series_contagem = contagens_por_coluna.get(coluna, pd.Series(dtype='int64'))
+            sigilosos = contagem_sigiloso[coluna]
+            total_ocorrencias = int(series_contagem.sum()) + sigilosos
+            if total_ocorrencias == 0:
+                logger.warning(f"Nenhum valor encontrado ou processado para a coluna '{coluna}' em {caminho_csv.name}")
+                resultados_finais[coluna] = {'contagens': pd.Series(dtype=int), 'total_ocorrencias': 0}
+            else:
+                resultados_finais[coluna] = {
+                    'contagens': series_contagem, # Retorna TODAS as contagens
+                    'total_ocorrencias': total_ocorrencias
+                }
+            if separar_sigiloso:
+                resultados_finais[coluna]['contagem_sigiloso'] = sigilosos
+
+        return resultados_finais
+
+    except Exception as e:
+        logger.error(f"Erro inesperado ao analisar '{caminho_csv.name}': {e}", exc_info=True)
+        return None
+    finally:
+        if pasta_parciais is not None:
+            shutil.rmtree(pasta_parciais, ignore_errors=True) # Parciais temporários nunca ficam em disco
@@ -14,9 +14,12 @@ import pandas as pd
 from pathlib import Path
 import logging
 import sys
-import re
-from collections import Counter
+import os
 import gc
+import numpy as np
+
+import analise_core # Parse, leitura em chunks e contagem (comum às análises)
+import cache_analise # Cache em disco (Parquet) dos resultados por arquivo
 
 # --- Configuração do Logging ---
 logging.basicConfig(
@@ -44,117 +47,30 @@ COLUNAS_ANALISE = [
 TOP_N = 10
 CHUNKSIZE_ANALISE = 100000
 
-# --- Funções Auxiliares ---
-
-def parse_multi_valor(valor_celula: str | float) -> list[str]:
-    """Extrai valores individuais de uma célula ('{Val1, Val2, ...}')."""
-    if pd.isna(valor_celula): return []
-    texto_str = str(valor_celula).strip()
-    if not texto_str: return []
-    if texto_str.startswith('{') and texto_str.endswith('}'):
-        texto_interno = texto_str[1:-1]
-    else:
-        texto_interno = texto_str
-    # Usa expressão regular para encontrar valores separados por vírgula,
-    # tratando espaços extras e evitando itens vazios se houver vírgulas duplas.
-    valores = [item.strip() for item in re.split(r'\s*,\s*', texto_interno) if item.strip()]
-    return valores
-
+# --- Função de Análise ---
 
-# *** FUNÇÃO DE ANÁLISE MODIFICADA ***
-def analisar_frequencias(caminho_csv: Path, colunas_analise: list) -> dict | None:
+def analisar_frequencias(caminho_csv: Path, colunas_analise: list, usar_kernel_numba: bool = False, spill_em_disco: bool = False) -> dict | None:
     """
-    Lê um arquivo CSV e calcula a frequência COMPLETA dos itens para colunas especificadas.
+    Lê um arquivo CSV e calcula a frequência COMPLETA dos itens para colunas especificadas
+    (sem filtro de linhas; a leitura e a contagem ficam em analise_core.analisar).
 
     Args:
         caminho_csv: Path do arquivo CSV a ser analisado.
         colunas_analise: Lista de nomes das colunas a analisar.
+        usar_kernel_numba: Conta via kernel Numba sobre os buffers Arrow (requer numba e
+            pyarrow; indicado para o arquivo consolidado). Sem eles, usa o caminho pandas.
+        spill_em_disco: Soma as contagens parciais de cada chunk via Parquet temporário em
+            vez de Counters em memória (RAM estável no arquivo consolidado; requer pyarrow).
 
     Returns:
         Dicionário onde cada chave é uma coluna_analise e o valor é outro dicionário
         contendo: {'contagens': pd.Series (todas contagens), 'total_ocorrencias': int}.
         Retorna None em caso de erro na leitura do arquivo.
     """
-    logger.info(f"Analisando frequências em: {caminho_csv.name}")
-    if not caminho_csv.exists():
-        logger.error(f"Arquivo não encontrado: {caminho_csv}")
-        return None
-
-    contadores = {col: Counter() for col in colunas_analise}
-    linhas_lidas_total = 0
-    colunas_presentes_no_arquivo = [] # Para verificar se as colunas existem
-
-    try:
-        # Verifica as colunas realmente presentes no arquivo antes de ler tudo
-        try:
-            df_peek = pd.read_csv(caminho_csv, sep=';', encoding='utf-8', nrows=1)
-            colunas_presentes_no_arquivo = df_peek.columns.tolist()
-            # Filtra colunas_analise para incluir apenas as que existem no arquivo
-            colunas_analise_existentes = [col for col in colunas_analise if col in colunas_presentes_no_arquivo]
-            if len(colunas_analise_existentes) < len(colunas_analise):
-                colunas_faltantes = set(colunas_analise) - set(colunas_presentes_no_arquivo)
-                logger.warning(f"Colunas de análise não encontradas em {caminho_csv.name}: {colunas_faltantes}. Analisando apenas as existentes.")
-            if not colunas_analise_existentes:
-                 logger.error(f"Nenhuma das colunas de análise foi encontrada em {caminho_csv.name}. Pulando análise.")
-                 return None # Retorna None se nenhuma coluna de análise existe
-        except Exception as peek_err:
-             logger.error(f"Erro ao verificar cabeçalho de {caminho_csv.name}: {peek_err}. Pulando análise.")
-             return None
-
-
-        dtypes_analise = {col: 'str' for col in colunas_analise_existentes} # Dtype apenas para colunas existentes
-
-        iterador_csv = pd.read_csv(
-            caminho_csv,
-            sep=';',
-            encoding='utf-8',
-            dtype=dtypes_analise,
-            chunksize=CHUNKSIZE_ANALISE,
-            usecols=colunas_analise_existentes, # Usa apenas colunas existentes
-            low_memory=False
-        )
-
-        for i, chunk in enumerate(iterador_csv):
-            logger.debug(f"Processando chunk de análise {i+1}...")
-            linhas_lidas_total += len(chunk)
-            for coluna in colunas_analise_existentes: # Itera apenas sobre colunas que existem
-                 # Otimização: Processa apenas colunas não vazias no chunk
-                 col_data = chunk[coluna].dropna()
-                 if not col_data.empty:
-                     # Aplica o parse, explode e conta
-                     items_exploded = col_data.apply(parse_multi_valor).explode().dropna()
-                     if not items_exploded.empty:
-                         contadores[coluna].update(items_exploded.tolist()) # Atualiza counter
-
-            del chunk, col_data, items_exploded # Libera memória
-            gc.collect() if i % 5 == 0 else None
-
-        logger.info(f"Análise de {caminho_csv.name} concluída. Total de linhas lidas: {linhas_lidas_total}")
-
-        # Processa os resultados finais
-        resultados_finais = {}
-        for coluna in colunas_analise_existentes: # Usa a lista de existentes
-            contador = contadores[coluna]
-            if not contador:
-                logger.warning(f"Nenhum valor encontrado ou processado para a coluna '{coluna}' em {caminho_csv.name}")
-                resultados_finais[coluna] = {
-                    'contagens': pd.Series(dtype=int),
-                    'total_ocorrencias': 0
-                }
-                continue
-
-            series_contagem = pd.Series(contador).sort_values(ascending=False)
-            total_ocorrencias = series_contagem.sum()
-            resultados_finais[coluna] = {
-                'contagens': series_contagem, # Retorna TODAS as contagens
-                'total_ocorrencias': total_ocorrencias
-            }
-
-        return resultados_finais
-
-    except Exception as e:
-        logger.error(f"Erro inesperado ao analisar '{caminho_csv.name}': {e}", exc_info=True)
-        return None
+    return analise_core.analisar(
+        caminho_csv, colunas_analise,
+        usar_kernel_numba=usar_kernel_numba, chunksize=CHUNKSIZE_ANALISE, spill_em_disco=spill_em_disco
+    )
 
 
 # *** FUNÇÃO DE EXIBIÇÃO MODIFICADA ***
@@ -193,34 +109,21 @@ def exibir_resultados(titulo: str, resultados_completos: dict, top_n: int):
         soma_top_n = top_n_contagens.sum()
         contagem_outros = total_ocorrencias - soma_top_n
 
-        # Prepara DataFrame para exibição
-        df_tabela = pd.DataFrame({
-            'Item': top_n_contagens.index.astype(str), # Garante que item seja string
-            'Contagem': top_n_contagens.values
-        })
-
-        # Calcula Percentual para Top N
-        df_tabela['Percentual'] = (df_tabela['Contagem'] / total_ocorrencias) * 100
-        df_tabela['Percentual'] = df_tabela['Percentual'].map('{:.2f}%'.format) # Formata
-
-        # Adiciona linha 'Outros', se houver itens além do Top N
+        # Monta a tabela de uma só vez: Top N + 'Outros' (se houver itens além do Top N) + 'TOTAL'
+        itens = top_n_contagens.index.astype(str).tolist() # Garante que item seja string
+        contagens = top_n_contagens.tolist()
         if total_itens_unicos > top_n and contagem_outros > 0:
-            percentual_outros = (contagem_outros / total_ocorrencias) * 100
-            outros_row = pd.DataFrame({
-                'Item': [f'Outros ({total_itens_unicos - top_n} itens)'],
-                'Contagem': [contagem_outros],
-                'Percentual': [f'{percentual_outros:.2f}%']
-            })
-            df_tabela = pd.concat([df_tabela, outros_row], ignore_index=True)
+            itens.append(f'Outros ({total_itens_unicos - top_n} itens)')
+            contagens.append(contagem_outros)
+        itens.append('TOTAL')
+        contagens.append(total_ocorrencias)
 
-        # Adiciona linha 'TOTAL'
-        total_row = pd.DataFrame({
-            'Item': ['TOTAL'],
-            'Contagem': [total_ocorrencias],
-            'Percentual': ['100.00%']
+        percentuais = np.asarray(contagens, dtype=float) / total_ocorrencias * 100
+        df_tabela = pd.DataFrame({
+            'Item': itens,
+            'Contagem': contagens,
+            'Percentual': np.char.mod('%.2f%%', percentuais)
         })
-        df_tabela = pd.concat([df_tabela, total_row], ignore_index=True)
-
 
         # Exibe a tabela formatada
         print(df_tabela.to_string(index=False))
@@ -237,19 +140,26 @@ def main_analise():
 
     # 1. Analisar o Arquivo Consolidado (Brasil)
     logger.info("--- Analisando Dados Consolidados (Brasil) ---")
-    resultados_completos_brasil = analisar_frequencias(
+    resultados_completos_brasil = cache_analise.analisar_com_cache(
+        analisar_frequencias,
         ARQUIVO_DADOS_CONSOLIDADO,
-        COLUNAS_ANALISE
+        COLUNAS_ANALISE,
+        usar_kernel_numba=True, # Arquivo grande: contagem compilada, se disponível
+        spill_em_disco=True # e contagens parciais em disco, sem acumular itens únicos em RAM
         # top_n não é mais passado aqui, é decidido na exibição
     )
     if resultados_completos_brasil:
         exibir_resultados("Resultados Consolidados - Brasil", resultados_completos_brasil, TOP_N)
     else:
         logger.error("Não foi possível gerar a análise consolidada do Brasil.")
+    gc.collect() # Uma coleta entre arquivos (não dentro do loop de chunks)
 
     # 2. Analisar Arquivos Regionais Individualmente
     logger.info("\n--- Analisando Dados Regionais ---")
-    arquivos_regionais = sorted(list(PASTA_DADOS_REGIONAIS.glob("*.csv"))) # Busca apenas CSV
+    arquivos_regionais = sorted(
+        Path(entrada.path) for entrada in os.scandir(PASTA_DADOS_REGIONAIS)
+        if entrada.is_file() and entrada.name.lower().endswith('.csv')
+    ) if PASTA_DADOS_REGIONAIS.is_dir() else [] # Busca apenas CSV
 
     if not arquivos_regionais:
         logger.warning(f"Nenhum arquivo CSV encontrado em {PASTA_DADOS_REGIONAIS} para análise regional.")
@@ -261,7 +171,8 @@ def main_analise():
             except Exception:
                  titulo_analise = f"Resultados Regionais - {caminho_csv_regional.name}"
 
-            resultados_completos_regional = analisar_frequencias(
+            resultados_completos_regional = cache_analise.analisar_com_cache(
+                analisar_frequencias,
                 caminho_csv_regional,
                 COLUNAS_ANALISE
             )
@@ -0,0 +1,128 @@
+# cache_analise.py
+# -*- coding: utf-8 -*-
+"""
+Módulo de cache em disco (Parquet) para os resultados de análise de frequência.
+
+Cada resultado é salvo em PASTA_CACHE/<hash>.parquet, onde o hash é derivado do
+caminho do CSV, do seu tamanho e data de modificação, da função de análise, dos
+parâmetros usados e do código-fonte que produz o resultado (o módulo da função e o
+analise_core). Se o CSV não mudou, a reexecução carrega o resultado em
+milissegundos. Para invalidar o cache, basta apagar a pasta.
+"""
+
+import pandas as pd
+from pathlib import Path
+import hashlib
+import logging
+import sys
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Parquet requer pyarrow; sem ele o cache é simplesmente desativado
+try:
+    import pyarrow
+    CACHE_DISPONIVEL = True
+except ImportError:
+    CACHE_DISPONIVEL = False
+
+# --- Configuração do Cache ---
+PASTA_CACHE = Path("./.cache_cnj")
+VERSAO_CACHE = 1 # Incrementar se o formato dos resultados mudar (mudanças no código já entram na chave)
+
+
+def _normalizar(valor):
+    """Converte parâmetros em uma representação estável (sets ordenados, listas como tuplas)."""
+    if isinstance(valor, (set, frozenset)): return tuple(sorted(map(_normalizar, valor)))
+    if isinstance(valor, (list, tuple)): return tuple(map(_normalizar, valor))
+    if isinstance(valor, dict): return tuple(sorted((k, _normalizar(v)) for k, v in valor.items()))
+    return valor
+
+
+@lru_cache(maxsize=None)
+def _hash_fonte(caminho_modulo: str) -> str:
+    """Hash do código-fonte de um módulo (lido uma vez por processo)."""
+    return hashlib.blake2b(Path(caminho_modulo).read_bytes(), digest_size=16).hexdigest()
+
+
+def _versao_codigo(funcao_analise) -> tuple:
+    """Hashes do módulo da função de análise e do analise_core: alterar o parse/contagem invalida o cache."""
+    modulos = {sys.modules.get(funcao_analise.__module__), sys.modules.get('analise_core')}
+    caminhos = sorted(m.__file__ for m in modulos if m is not None and getattr(m, '__file__', None))
+    return tuple(_hash_fonte(caminho) for caminho in caminhos)
+
+
+def chave_cache(caminho_csv: Path, funcao_analise, *args, **kwargs) -> str:
+    """Gera a chave do cache a partir do arquivo (caminho, tamanho, mtime) e dos parâmetros."""
+    stat = caminho_csv.stat()
+    identificacao = (
+        VERSAO_CACHE,
+        str(caminho_csv.resolve()), stat.st_size, stat.st_mtime_ns,
+        funcao_analise.__qualname__, _versao_codigo(funcao_analise),
+        _normalizar(args), _normalizar(kwargs)
+    )
+    return hashlib.blake2b(repr(identificacao).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _resultados_para_df(resultados: dict) -> pd.DataFrame:
+    """Serializa {coluna: {'contagens': Series, 'total_ocorrencias': int, ...}} em formato longo."""
+    partes = []
+    for coluna, dados in resultados.items():
+        contagens = dados['contagens']
+        partes.append(pd.DataFrame({
+            'coluna': coluna,
+            'campo': 'contagens',
+            'item': contagens.index.astype(str),
+            'contagem': contagens.to_numpy(dtype='int64')
+        }))
+        # Demais campos (total_ocorrencias, contagem_sigiloso) como linhas sem item
+        escalares = {campo: int(valor) for campo, valor in dados.items() if campo != 'contagens'}
+        partes.append(pd.DataFrame({
+            'coluna': coluna,
+            'campo': list(escalares),
+            'item': None,
+            'contagem': list(escalares.values())
+        }))
+    return pd.concat(partes, ignore_index=True).astype({'coluna': str, 'campo': str, 'item': object, 'contagem': 'int64'})
+
+
+def _df_para_resultados(df: pd.DataFrame) -> dict:
+    """Reconstrói o dicionário de resultados a partir do formato longo (ordem preservada)."""
+    resultados = {}
+    for coluna, grupo in df.groupby('coluna', sort=False):
+        linhas_contagem = grupo[grupo['campo'] == 'contagens']
+        dados = {'contagens': pd.Series(linhas_contagem['contagem'].to_numpy(), index=linhas_contagem['item'].to_numpy(), dtype='int64')}
+        for campo, valor in grupo.loc[grupo['campo'] != 'contagens', ['campo', 'contagem']].itertuples(index=False):
+            dados[campo] = int(valor)
+        resultados[coluna] = dados
+    return resultados
+
+
+def analisar_com_cache(funcao_analise, caminho_csv: Path, *args, **kwargs) -> dict | None:
+    """
+    Executa `funcao_analise(caminho_csv, *args, **kwargs)` com memoização em disco.
+
+    Falhas de leitura/escrita do cache nunca interrompem a análise: apenas recalcula.
+    """
+    if not CACHE_DISPONIVEL or not caminho_csv.exists():
+        return funcao_analise(caminho_csv, *args, **kwargs)
+
+    arquivo_cache = PASTA_CACHE / f"{chave_cache(caminho_csv, funcao_analise, *args, **kwargs)}.parquet"
+    if arquivo_cache.exists():
+        try:
+            resultados = _df_para_resultados(pd.read_parquet(arquivo_cache))
+            logger.info(f"Resultado de {caminho_csv.name} carregado do cache ({arquivo_cache.name}).")
+            return resultados
+        except Exception as e:
+            logger.warning(f"Cache inválido para {caminho_csv.name} ({arquivo_cache.name}): {e}. Recalculando.")
+
+    resultados = funcao_analise(caminho_csv, *args, **kwargs)
+    if resultados:
+        try:
+            PASTA_CACHE.mkdir(parents=True, exist_ok=True)
+            arquivo_temp = arquivo_cache.with_suffix('.tmp')
+            _resultados_para_df(resultados).to_parquet(arquivo_temp, index=False)
+            arquivo_temp.replace(arquivo_cache) # Escrita atômica (evita cache parcial)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar o cache de {caminho_csv.name}: {e}")
+    return resultados
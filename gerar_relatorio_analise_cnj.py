@@ -20,10 +20,18 @@ from pathlib import Path
 import zipfile
 import logging
 import sys
-import re
-from collections import Counter
-import gc
-from fpdf import FPDF # <-- CORRIGIDO: Importa apenas FPDF
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fpdf import FPDF, FontFace # <-- CORRIGIDO: Importa apenas FPDF (e FontFace, estilo do cabeçalho das tabelas)
+
+import analise_core # Parse vetorizado das colunas multi-valoradas
+
+# Polars é opcional: backend alternativo (leitura, explode e contagem em Rust, multi-thread)
+try:
+    import polars as pl
+    POLARS_DISPONIVEL = True
+except ImportError:
+    POLARS_DISPONIVEL = False
 
 # --- Configuração do Logging ---
 log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
@@ -63,95 +71,159 @@ TOP_N = 10
 CHUNKSIZE_ANALISE = 100000
 PALAVRAS_CHAVE_ENTES_PUBLICOS = {'ORGAO PUBLICO', 'ESTADO OU DISTRITO FEDERAL', 'MUNICIPIO', 'AUTARQUIA', 'FUNDACAO PUBLICA', 'UNIAO', 'SECRETARIA', 'PROCURADORIA', 'FAZENDA', 'FEDERAL', 'ESTADUAL', 'MUNICIPAL', 'INSTITUTO NACIONAL DO SEGURO SOCIAL', 'ADVOCACIA GERAL DA UNIAO'}
 
-# Tenta usar lxml para melhor performance do CSV, senão usa engine python
-try:
-    import lxml
-    CSV_ENGINE = 'lxml' # Não é um parâmetro direto do read_csv, mas indica a tentativa
-    HTML_PARSER = 'lxml'
-    logger.info("Biblioteca lxml encontrada. Será usada onde aplicável.")
-except ImportError:
-    logging.warning("Biblioteca 'lxml' não encontrada.")
-    CSV_ENGINE = 'python' # read_csv usa C por padrão, mas pode usar python
-    HTML_PARSER = 'html.parser'
+# Leitura do CSV: PyArrow (tokenização multi-thread, colunas Arrow) quando disponível, senão engine C do pandas
+CSV_ENGINE = 'pyarrow' if analise_core.PYARROW_DISPONIVEL else 'c'
+USAR_POLARS = False # Opcional: True usa o backend Polars (scan_csv preguiçoso + group_by em streaming), se instalado
+USAR_IDS_INTERNADOS = analise_core.NUMBA_DISPONIVEL # Com Numba: itens internados como ids inteiros e somados no kernel compilado
+if CSV_ENGINE == 'c': logger.warning("Biblioteca 'pyarrow' não encontrada. Usando a engine C do pandas para ler os CSVs.")
 
 
 # --- Funções Auxiliares de Processamento ---
-# (parse_multi_valor, eh_ente_publico - Mantidas como na versão anterior)
-def parse_multi_valor(valor_celula: str | float) -> list[str]:
-    if pd.isna(valor_celula): return []
-    texto_str = str(valor_celula).strip()
-    if not texto_str: return []
-    if texto_str.startswith('{') and texto_str.endswith('}'): texto_interno = texto_str[1:-1]
-    else: texto_interno = texto_str
-    valores = [item.strip() for item in re.split(r'\s*,\s*', texto_interno) if item.strip()]
-    return valores
-
-def eh_ente_publico(texto_natjur: str | float, palavras_chave: set) -> bool:
-    if pd.isna(texto_natjur): return False
-    lista_naturezas = parse_multi_valor(texto_natjur)
-    if not lista_naturezas: return False
-    for natureza in lista_naturezas:
-        natureza_upper = natureza.upper()
-        for chave in palavras_chave:
-            if chave in natureza_upper: return True
-    return False
+# Todas as palavras-chave em uma única alternação (mais longas primeiro): uma só varredura por categoria
+# (as palavras-chave não contêm vírgulas nem chaves: buscar na célula inteira equivale a buscar item a item)
+_ENTES_RE = analise_core.compilar_padrao_palavras(frozenset(PALAVRAS_CHAVE_ENTES_PUBLICOS))
+
+def _ler_csv_pandas_em_chunks(caminho_csv: Path, colunas: list, dtypes: dict):
+    """Lê o CSV em chunks com a engine do pandas, por um arquivo aberto com buffer de 16 MiB (menos syscalls)."""
+    with open(caminho_csv, 'rb', buffering=16 * 1024 * 1024) as arquivo:
+        yield from pd.read_csv(arquivo, sep=';', encoding='utf-8', engine=CSV_ENGINE, dtype=dtypes, chunksize=CHUNKSIZE_ANALISE, usecols=set(colunas), low_memory=False) # usecols como set: teste de pertinência O(1)
+
+def _contar_chunk(chunk_processar: pd.DataFrame, colunas: list, contadores: dict, contagem_sigiloso: dict, _parse_series=analise_core.parse_series):
+    """Acumula nos contadores de um modo (Geral ou vs Entes Públicos) as ocorrências de um chunk."""
+    for coluna in colunas:
+         if coluna not in chunk_processar.columns: continue
+         # Células se repetem muito (polos, naturezas): parse só das células únicas, ponderado pela frequência
+         celulas = chunk_processar[coluna].value_counts() # Sem NaN
+         itens = _parse_series(pd.Series(celulas.index)) # Índice = posição da célula em `celulas`
+         if itens.empty: continue
+         pesos = celulas.to_numpy()[itens.index.to_numpy()]
+         contagem_chunk = pd.Series(pesos).groupby(itens.to_numpy(dtype=object), sort=False).sum() # Merge abaixo só nos itens únicos
+         mascara_sigiloso = contagem_chunk.index.str.upper() == 'SIGILOSO' # 'Sigiloso', 'SIGILOSO'...
+         contagem_sigiloso[coluna] += int(contagem_chunk[mascara_sigiloso].sum())
+         contagem_chunk = contagem_chunk[~mascara_sigiloso]
+         contador = contadores[coluna]; contador_get = contador.get
+         for item, contagem in zip(contagem_chunk.index, contagem_chunk.tolist()):
+             contador[item] = contador_get(item, 0) + contagem
+
+def _contar_polars(caminho_csv: Path, colunas: list, coluna_filtro_ente: str | None, modos: tuple) -> tuple[dict, dict, int, dict]:
+    """
+    Backend Polars: mesma contagem dos chunks do pandas, executada como consultas preguiçosas.
+
+    Retorna (contadores, contagem_sigiloso, linhas_lidas, linhas_processadas) no formato por modo
+    usado em analisar_frequencias. As consultas compartilham o mesmo scan_csv e rodam juntas.
+    """
+    lf = pl.scan_csv(caminho_csv, separator=';', encoding='utf8-lossy', infer_schema=False).select(
+        list(dict.fromkeys(colunas + ([coluna_filtro_ente] if coluna_filtro_ente else []))))
+    lf_por_modo = {
+        modo: lf.filter(pl.col(coluna_filtro_ente).str.to_uppercase().str.contains(_ENTES_RE.pattern)) if modo == 'entes' and coluna_filtro_ente else lf
+        for modo in modos
+    }
+    consultas = [lf.select(pl.len())] + [lf_modo.select(pl.len()) for lf_modo in lf_por_modo.values()]
+    for lf_modo in lf_por_modo.values():
+        for coluna in colunas:
+            # Mesmo parse de analise_core.parse_series: tira as chaves, separa por vírgula, descarta vazios
+            consultas.append(
+                lf_modo.select(pl.col(coluna).str.strip_chars().str.strip_prefix('{').str.strip_suffix('}').str.split(','))
+                .explode(coluna).select(pl.col(coluna).str.strip_chars())
+                .filter(pl.col(coluna).is_not_null() & (pl.col(coluna) != ''))
+                .group_by(coluna).len()
+            )
+    resultados = iter(pl.collect_all(consultas, engine='streaming'))
+    linhas_lidas_total = next(resultados).item()
+    linhas_processadas = {modo: next(resultados).item() for modo in lf_por_modo}
+    contadores = {modo: {} for modo in modos}; contagem_sigiloso = {modo: {} for modo in modos}
+    for modo in lf_por_modo:
+        for coluna in colunas:
+            df_contagem = next(resultados)
+            itens, contagens = df_contagem[coluna].to_list(), df_contagem['len'].to_list()
+            contador = {}; sigilosos = 0
+            for item, contagem in zip(itens, contagens):
+                if item.upper() == 'SIGILOSO': sigilosos += contagem # 'Sigiloso', 'SIGILOSO'...
+                else: contador[item] = contagem
+            contadores[modo][coluna] = contador; contagem_sigiloso[modo][coluna] = sigilosos
+    return contadores, contagem_sigiloso, linhas_lidas_total, linhas_processadas
+
+def _contar_chunk_ids(chunk_processar: pd.DataFrame, colunas: list, contadores_ids: dict, contagem_sigiloso: dict, _parse_series=analise_core.parse_series):
+    """Como _contar_chunk, mas acumula em (tabela de ids, totais) por coluna via analise_core.acumular_por_id."""
+    for coluna in colunas:
+         if coluna not in chunk_processar.columns: continue
+         celulas = chunk_processar[coluna].value_counts() # Sem NaN
+         itens = _parse_series(pd.Series(celulas.index))
+         if itens.empty: continue
+         pesos = celulas.to_numpy()[itens.index.to_numpy()]
+         itens = itens.to_numpy(dtype=object)
+         mascara_sigiloso = np.char.upper(itens.astype(str)) == 'SIGILOSO'
+         contagem_sigiloso[coluna] += int(pesos[mascara_sigiloso].sum())
+         tabela_ids, totais = contadores_ids[coluna]
+         contadores_ids[coluna] = (tabela_ids, analise_core.acumular_por_id(tabela_ids, totais, itens[~mascara_sigiloso], pesos[~mascara_sigiloso]))
 
 # --- Função Principal de Análise (analisar_frequencias) ---
-# (Mantida como na versão anterior, com filtro opcional)
-def analisar_frequencias(caminho_csv: Path, colunas_analise: list, filtrar_por_ente_publico: bool = False, coluna_filtro_ente: str | None = None, palavras_chave_entes: set | None = None) -> dict | None:
-    tipo_analise = " (vs Entes Públicos)" if filtrar_por_ente_publico else " (Geral)"
-    logger.info(f"Analisando frequências{tipo_analise} em: {caminho_csv.name}")
+# Uma única leitura do CSV alimenta os dois modos: 'geral' (todas as linhas) e 'entes' (só linhas com ente público no polo passivo)
+def analisar_frequencias(caminho_csv: Path, colunas_analise: list, coluna_filtro_ente: str | None = None, modos: tuple = ('geral', 'entes')) -> dict | None:
+    logger.info(f"Analisando frequências ({', '.join(modos)}) em: {caminho_csv.name}")
     if not caminho_csv.exists(): logger.error(f"Arquivo não encontrado: {caminho_csv}"); return None
-    colunas_para_ler = list(set(colunas_analise + ([coluna_filtro_ente] if filtrar_por_ente_publico and coluna_filtro_ente else [])))
-    dtypes_analise = {col: 'str' for col in colunas_para_ler}
-    contadores = {col: Counter() for col in colunas_analise}
-    contagem_sigiloso = {col: 0 for col in colunas_analise}
-    linhas_lidas_total = 0; linhas_processadas_analise = 0
+    linhas_lidas_total = 0; linhas_processadas_analise = {modo: 0 for modo in modos}
     colunas_analise_existentes = []
     try:
         try:
-            df_peek = pd.read_csv(caminho_csv, sep=';', encoding='utf-8', nrows=1)
-            colunas_presentes = df_peek.columns.tolist()
+            colunas_presentes = pd.read_csv(caminho_csv, sep=';', encoding='utf-8', nrows=0).columns.tolist() # Só o cabeçalho
             colunas_analise_existentes = [col for col in colunas_analise if col in colunas_presentes]
-            coluna_filtro_ente_existe = coluna_filtro_ente in colunas_presentes if coluna_filtro_ente else True
+            filtrar_por_ente_publico = 'entes' in modos and coluna_filtro_ente is not None
             if not colunas_analise_existentes: logger.error(f"Nenhuma coluna de análise encontrada em {caminho_csv.name}. Pulando."); return None
-            if filtrar_por_ente_publico and not coluna_filtro_ente_existe: logger.error(f"Coluna filtro '{coluna_filtro_ente}' não encontrada em {caminho_csv.name}. Pulando filtro ente público."); filtrar_por_ente_publico=False
-            colunas_para_ler_final = list(set(colunas_analise_existentes + ([coluna_filtro_ente] if filtrar_por_ente_publico and coluna_filtro_ente_existe else [])))
+            if filtrar_por_ente_publico and coluna_filtro_ente not in colunas_presentes: logger.error(f"Coluna filtro '{coluna_filtro_ente}' não encontrada em {caminho_csv.name}. Pulando filtro ente público."); filtrar_por_ente_publico=False
+            # Projeção: lê somente as colunas pedidas pelo chamador (e a do filtro, se houver)
+            colunas_para_ler_final = list(dict.fromkeys(colunas_analise_existentes + ([coluna_filtro_ente] if filtrar_por_ente_publico else [])))
             dtypes_analise = {col: 'str' for col in colunas_para_ler_final}
-            contadores = {col: Counter() for col in colunas_analise_existentes}
-            contagem_sigiloso = {col: 0 for col in colunas_analise_existentes}
+            contadores = {modo: {col: {} for col in colunas_analise_existentes} for modo in modos} # dict simples: merge com .get, sem a camada Python do Counter
+            contagem_sigiloso = {modo: {col: 0 for col in colunas_analise_existentes} for modo in modos}
         except Exception as peek_err: logger.error(f"Erro cabeçalho {caminho_csv.name}: {peek_err}."); return None
 
-        iterador_csv = pd.read_csv(caminho_csv, sep=';', encoding='utf-8', dtype=dtypes_analise, chunksize=CHUNKSIZE_ANALISE, usecols=colunas_para_ler_final, low_memory=False)
-        for i, chunk in enumerate(iterador_csv):
-            logger.debug(f"Processando chunk análise {i+1}{tipo_analise}..."); linhas_lidas_total += len(chunk)
-            chunk_processar = chunk
-            if filtrar_por_ente_publico and coluna_filtro_ente_existe:
-                mascara_ente_publico = chunk[coluna_filtro_ente].apply(eh_ente_publico, args=(palavras_chave_entes,))
-                chunk_processar = chunk[mascara_ente_publico]
-            linhas_processadas_analise += len(chunk_processar)
-            if chunk_processar.empty: del chunk, chunk_processar; gc.collect() if i%5==0 else None; continue
-            for coluna in colunas_analise_existentes:
-                 if coluna not in chunk_processar.columns: continue
-                 col_data = chunk_processar[coluna].dropna()
-                 if not col_data.empty:
-                    items_parsed = col_data.apply(parse_multi_valor)
-                    for lista_items in items_parsed:
-                        for item in lista_items:
-                            item_strip_upper = item.strip().upper()
-                            if item_strip_upper == 'SIGILOSO': contagem_sigiloso[coluna] += 1
-                            elif item_strip_upper: contadores[coluna][item] += 1
-            del chunk, chunk_processar, col_data, items_parsed; gc.collect() if i%5==0 else None
-
-        logger.info(f"Análise{tipo_analise} de {caminho_csv.name} concluída. Lidas: {linhas_lidas_total}, Processadas: {linhas_processadas_analise}")
-        resultados_finais = {}
-        for coluna in colunas_analise:
-            if coluna not in colunas_analise_existentes: resultados_finais[coluna] = {'contagens': pd.Series(dtype=int),'total_ocorrencias': 0,'contagem_sigiloso': 0}; continue
-            contador = contadores.get(coluna, Counter()); sigilosos = contagem_sigiloso.get(coluna, 0); total_ocorrencias_geral = sum(contador.values()) + sigilosos
-            if total_ocorrencias_geral == 0: resultados_finais[coluna] = {'contagens': pd.Series(dtype=int),'total_ocorrencias': 0,'contagem_sigiloso': 0}; continue
-            series_contagem = pd.Series(contador).sort_values(ascending=False)
-            resultados_finais[coluna] = {'contagens': series_contagem, 'total_ocorrencias': total_ocorrencias_geral, 'contagem_sigiloso': sigilosos}
-        return resultados_finais
+        if USAR_POLARS and POLARS_DISPONIVEL:
+            contadores, contagem_sigiloso, linhas_lidas_total, linhas_processadas_analise = _contar_polars(
+                caminho_csv, colunas_analise_existentes, coluna_filtro_ente if filtrar_por_ente_publico else None, modos)
+        else:
+            if CSV_ENGINE == 'pyarrow':
+                # Leitor em streaming do Arrow: paraleliza a tokenização sem abrir mão dos chunks
+                # (engine='pyarrow' do read_csv não aceita chunksize e carregaria o arquivo inteiro)
+                iterador_csv = (chunk for _, chunk in analise_core.ler_csv_em_chunks(caminho_csv, colunas_para_ler_final, CHUNKSIZE_ANALISE))
+            else:
+                iterador_csv = _ler_csv_pandas_em_chunks(caminho_csv, colunas_para_ler_final, dtypes_analise)
+            if USAR_IDS_INTERNADOS: # Estado por coluna: (texto -> id, totais indexados pelo id)
+                contadores = {modo: {col: ({}, np.zeros(1024, dtype=np.int64)) for col in colunas_analise_existentes} for modo in modos}
+            # Nomes invariantes usados no laço ligados como locais (LOAD_FAST em vez de buscas globais/atributos)
+            _contar = _contar_chunk_ids if USAR_IDS_INTERNADOS else _contar_chunk; _busca_entes = _ENTES_RE.search
+            leitura = analise_core.prefetch(iterador_csv) # Próximo chunk lido em paralelo
+            try:
+                for i, chunk in enumerate(leitura):
+                    logger.debug(f"Processando chunk análise {i+1}..."); linhas_lidas_total += len(chunk)
+                    for modo in modos:
+                        chunk_processar = chunk
+                        if modo == 'entes' and filtrar_por_ente_publico:
+                            # Poucas naturezas jurídicas distintas: o regex roda uma vez por categoria, não por linha
+                            natjur = chunk[coluna_filtro_ente].astype('category')
+                            # Bitmap indexado pelo código da categoria; a posição extra (False) atende o código -1 (célula vazia)
+                            entes_bitmap = np.array([_busca_entes(str(categoria).upper()) is not None for categoria in natjur.cat.categories] + [False], dtype=bool)
+                            chunk_processar = chunk[entes_bitmap[natjur.cat.codes.to_numpy()]] # Filtro por linha = um único gather do NumPy
+                        linhas_processadas_analise[modo] += len(chunk_processar)
+                        if not chunk_processar.empty: _contar(chunk_processar, colunas_analise_existentes, contadores[modo], contagem_sigiloso[modo])
+                    del chunk # Contagem de referências libera o chunk; sem gc.collect() no loop
+            finally:
+                leitura.close() # Erro na contagem: encerra a thread de leitura e fecha o arquivo já aqui
+            if USAR_IDS_INTERNADOS:
+                contadores = {modo: {col: analise_core.contador_de_ids(*estado) for col, estado in por_coluna.items()} for modo, por_coluna in contadores.items()}
+
+        logger.info(f"Análise de {caminho_csv.name} concluída. Lidas: {linhas_lidas_total}, Processadas: {linhas_processadas_analise}")
+        resultados_por_modo = {}
+        for modo in modos:
+            resultados_finais = {}
+            for coluna in colunas_analise:
+                if coluna not in colunas_analise_existentes: resultados_finais[coluna] = {'contagens': pd.Series(dtype=int),'total_ocorrencias': 0,'contagem_sigiloso': 0}; continue
+                contador = contadores[modo].get(coluna, {}); sigilosos = contagem_sigiloso[modo].get(coluna, 0); total_ocorrencias_geral = sum(contador.values()) + sigilosos
+                if total_ocorrencias_geral == 0: resultados_finais[coluna] = {'contagens': pd.Series(dtype=int),'total_ocorrencias': 0,'contagem_sigiloso': 0}; continue
+                series_contagem = pd.Series(contador).sort_values(ascending=False)
+                resultados_finais[coluna] = {'contagens': series_contagem, 'total_ocorrencias': total_ocorrencias_geral, 'contagem_sigiloso': sigilosos}
+            resultados_por_modo[modo] = resultados_finais
+        return resultados_por_modo
     except Exception as e: logger.error(f"Erro inesperado ao analisar '{caminho_csv.name}': {e}", exc_info=True); return None
 
 
@@ -170,22 +242,18 @@ def formatar_tabela_analise(dados_contagem: dict, top_n: int = TOP_N) -> pd.Data
     soma_top_n = top_n_contagens.sum()
     contagem_outros = total_validas - soma_top_n
 
-    if not top_n_contagens.empty:
-        df_tabela = pd.DataFrame({'Item': top_n_contagens.index.astype(str), 'Contagem': top_n_contagens.values})
-        df_tabela['Percentual'] = (df_tabela['Contagem'] / total_ocorrencias * 100).map('{:.2f}%'.format) if total_ocorrencias > 0 else '0.00%'
-    else: df_tabela = pd.DataFrame(columns=['Item', 'Contagem', 'Percentual'])
+    # Todas as linhas (Top N, 'Outros', 'Sigiloso', 'TOTAL GERAL') em uma lista; um único DataFrame no final
+    linhas = [
+        {'Item': item, 'Contagem': contagem, 'Percentual': f'{contagem / total_ocorrencias * 100:.2f}%'}
+        for item, contagem in zip(top_n_contagens.index.astype(str), top_n_contagens.tolist())
+    ]
     if total_itens_unicos_validos > top_n and contagem_outros > 0:
-        percentual_outros = (contagem_outros / total_ocorrencias * 100) if total_ocorrencias > 0 else 0
-        outros_row = pd.DataFrame({'Item': [f'Outros ({total_itens_unicos_validos - top_n} itens)'], 'Contagem': [contagem_outros], 'Percentual': [f'{percentual_outros:.2f}%']})
-        df_tabela = pd.concat([df_tabela, outros_row], ignore_index=True)
+        linhas.append({'Item': f'Outros ({total_itens_unicos_validos - top_n} itens)', 'Contagem': contagem_outros, 'Percentual': f'{contagem_outros / total_ocorrencias * 100:.2f}%'})
     if contagem_sigiloso > 0:
-        perc_sigiloso = (contagem_sigiloso / total_ocorrencias * 100) if total_ocorrencias > 0 else 0
-        sigiloso_row = pd.DataFrame({'Item': ['Sigiloso'], 'Contagem': [contagem_sigiloso], 'Percentual': [f'{perc_sigiloso:.2f}%']})
-        df_tabela = pd.concat([df_tabela, sigiloso_row], ignore_index=True)
-    if not df_tabela.empty or contagem_sigiloso > 0:
-        total_row = pd.DataFrame({'Item': ['TOTAL GERAL'], 'Contagem': [total_ocorrencias], 'Percentual': ['100.00%']})
-        df_tabela = pd.concat([df_tabela, total_row], ignore_index=True)
-    return df_tabela if not df_tabela.empty else None
+        linhas.append({'Item': 'Sigiloso', 'Contagem': contagem_sigiloso, 'Percentual': f'{contagem_sigiloso / total_ocorrencias * 100:.2f}%'})
+    if not linhas: return None
+    linhas.append({'Item': 'TOTAL GERAL', 'Contagem': total_ocorrencias, 'Percentual': '100.00%'})
+    return pd.DataFrame(linhas, columns=['Item', 'Contagem', 'Percentual'])
 
 
 def exportar_analises_csv(resultados_por_contexto: dict, arquivo_saida_csv: Path, top_n: int = TOP_N):
@@ -230,19 +298,19 @@ class PDFReport(FPDF):
             italic_font = font_dir / "DejaVuSans-Oblique.ttf"
             bold_italic_font = font_dir / "DejaVuSans-BoldOblique.ttf"
             if regular_font.exists():
-                self.add_font('DejaVu', '', regular_font, uni=True)
+                self.add_font('DejaVu', '', regular_font)
                 self.font_name = 'DejaVu'; logger.info("Usando fonte base 'DejaVuSans' para PDF.")
                 self.has_bold = False; self.has_italic = False # Reseta flags
                 if bold_font.exists():
-                    try: self.add_font('DejaVu', 'B', bold_font, uni=True); self.has_bold = True; logger.info("  -> Estilo Negrito (B) carregado.")
+                    try: self.add_font('DejaVu', 'B', bold_font); self.has_bold = True; logger.info("  -> Estilo Negrito (B) carregado.")
                     except Exception as fe_b: logger.warning(f"  -> Erro FPDF ao adicionar DejaVu Bold: {fe_b}")
                 else: logger.warning("Arquivo DejaVuSans-Bold.ttf não encontrado.")
                 if italic_font.exists():
-                    try: self.add_font('DejaVu', 'I', italic_font, uni=True); self.has_italic = True; logger.info("  -> Estilo Itálico (I) carregado.")
+                    try: self.add_font('DejaVu', 'I', italic_font); self.has_italic = True; logger.info("  -> Estilo Itálico (I) carregado.")
                     except Exception as fe_i: logger.warning(f"  -> Erro FPDF ao adicionar DejaVu Italic: {fe_i}")
                 else: logger.warning("Arquivo DejaVuSans-Oblique.ttf não encontrado.")
                 if bold_italic_font.exists() and self.has_bold and self.has_italic:
-                     try: self.add_font('DejaVu', 'BI', bold_italic_font, uni=True); logger.info("  -> Estilo Negrito-Itálico (BI) carregado.")
+                     try: self.add_font('DejaVu', 'BI', bold_italic_font); logger.info("  -> Estilo Negrito-Itálico (BI) carregado.")
                      except Exception as fe_bi: logger.warning(f"  -> Erro FPDF ao adicionar DejaVu Bold-Italic: {fe_bi}")
                 else: logger.debug("Arquivo DejaVuSans-BoldOblique.ttf não encontrado ou B/I falharam.")
             else: logger.warning("Arquivo 'DejaVuSans.ttf' (Regular) não encontrado. Usando 'helvetica'.")
@@ -286,28 +354,20 @@ class PDFReport(FPDF):
         if df_tabela is None or df_tabela.empty:
              self.set_font_style('I', 9); self.write(5, "(Nenhum dado)\n"); self.ln(2); return
 
-        col_widths = {'Item': 110, 'Contagem': 30, 'Percentual': 30}
-        line_height = self.font_size * 1.5
-
-        # Cabeçalho da tabela
-        self.set_font_style('B', 9)
-        for col_name in df_tabela.columns:
-            self.cell(col_widths[col_name], line_height, col_name, border=1, align='C')
-        self.ln(line_height)
-
-        # Linhas de dados
+        # API de tabelas do fpdf2: layout e quebra de página por linha feitos internamente
+        # (sem medir cada multi_cell e reposicionar com get_y/set_xy)
+        estilo_cabecalho = FontFace(emphasis='BOLD' if self.font_name == 'helvetica' or self.has_bold else None, size_pt=9)
         self.set_font_style('', 8)
-        for index, row in df_tabela.iterrows():
-            current_x = self.get_x(); current_y = self.get_y(); max_h = line_height
-            # *** CORRIGIDO: Removido ln=3 e max_line_height de multi_cell ***
-            self.multi_cell(col_widths['Item'], line_height, str(row['Item']), border='LR', align='L')
-            h_item = self.get_y() - current_y
-            max_h = max(max_h, h_item)
-            self.set_xy(current_x + col_widths['Item'], current_y)
-            self.cell(col_widths['Contagem'], max_h, str(row['Contagem']), border='LR', align='R', ln=0) # Border LR para alinhar com multicell
-            self.cell(col_widths['Percentual'], max_h, str(row['Percentual']), border='LR', align='R', ln=1) # Border LR e ln=1
-        # Desenha linha inferior da tabela
-        self.cell(sum(col_widths.values()), 0, '', border='T', ln=1)
+        self.set_fill_color(255, 255, 255) # A tabela herda o estado atual (o azul do chapter_title pintaria as células)
+        with self.table(
+            width=170, col_widths=(110, 30, 30), align='LEFT',
+            text_align=('LEFT', 'RIGHT', 'RIGHT'), line_height=self.font_size * 1.5,
+            headings_style=estilo_cabecalho
+        ) as tabela:
+            tabela.row(df_tabela.columns.tolist())
+            # Colunas como arrays NumPy: sem montar uma tupla/Series por linha no pandas
+            for item, contagem, percentual in zip(*(df_tabela[coluna].to_numpy() for coluna in df_tabela.columns)):
+                tabela.row((str(item), str(contagem), str(percentual)))
         self.ln(4)
 
 
@@ -318,6 +378,7 @@ def exportar_analises_pdf(resultados_por_contexto: dict, arquivo_saida_pdf: Path
     arquivo_saida_pdf.parent.mkdir(parents=True, exist_ok=True)
     try:
         pdf = PDFReport('P', 'mm', 'A4') # Cria instância
+        pdf.set_compression(True) # Streams de página comprimidos (zlib); fontes TTF já são embutidas só com os glifos usados
 
         for titulo, resultados_completos in resultados_por_contexto.items():
              pdf.add_page()
@@ -352,44 +413,41 @@ def exportar_analises_pdf(resultados_por_contexto: dict, arquivo_saida_pdf: Path
         logger.error(f"Erro geral ao exportar análise para PDF: {e}", exc_info=True)
 
 # --- Função Principal de Orquestração ---
+def _worker(caminho_csv: Path) -> dict | None:
+    """Executa, em um processo do pool, as análises Geral e vs Entes Públicos de um arquivo (uma leitura)."""
+    return analisar_frequencias(caminho_csv, COLUNAS_ANALISE, COLUNA_NATJUR_PASSIVO)
+
 def main():
     """Função principal que orquestra a análise e exportação."""
     logger.info(">>> INICIANDO SCRIPT DE ANÁLISE CNJ SAÚDE (GERAL E ENTES PÚBLICOS) <<<")
     PASTA_SAIDA_RELATORIOS.mkdir(parents=True, exist_ok=True)
     resultados_todas_analises = {}
 
-    # --- ANÁLISE GERAL ---
-    logger.info("\n=== REALIZANDO ANÁLISE GERAL (TODOS OS PROCESSOS DE SAÚDE) ===")
-    resultados_brasil_geral = analisar_frequencias(ARQUIVO_DADOS_CONSOLIDADO, COLUNAS_ANALISE, False)
-    if resultados_brasil_geral: resultados_todas_analises["Brasil Consolidado - Geral"] = resultados_brasil_geral
-    else: logger.warning("Não foi possível gerar a análise geral consolidada.")
+    # --- MONTA AS ANÁLISES: CONSOLIDADO (BRASIL) E REGIONAIS ---
     arquivos_regionais = sorted(list(PASTA_DADOS_REGIONAIS.glob("*.csv")))
-    if arquivos_regionais:
-        logger.info(f"Encontrados {len(arquivos_regionais)} arquivos regionais para análise geral.")
-        for caminho_csv in arquivos_regionais:
-            nome_analise = caminho_csv.stem.replace('dados_saude_', '')
-            titulo = f"Regional {nome_analise} - Geral"
-            resultados_reg = analisar_frequencias(caminho_csv, COLUNAS_ANALISE, False)
-            if resultados_reg: resultados_todas_analises[titulo] = resultados_reg
-            else: logger.error(f"Falha análise geral: {caminho_csv.name}")
-            gc.collect()
-    else: logger.warning(f"Nenhum arquivo CSV encontrado em {PASTA_DADOS_REGIONAIS} para análise regional geral.")
-
-    # --- ANÁLISE ENTES PÚBLICOS ---
-    logger.info("\n=== REALIZANDO ANÁLISE FOCADA (PROCESSOS CONTRA ENTES PÚBLICOS) ===")
-    resultados_brasil_entes = analisar_frequencias(ARQUIVO_DADOS_CONSOLIDADO, COLUNAS_ANALISE, True, COLUNA_NATJUR_PASSIVO, PALAVRAS_CHAVE_ENTES_PUBLICOS)
-    if resultados_brasil_entes: resultados_todas_analises["Brasil Consolidado - vs Entes Públicos"] = resultados_brasil_entes
-    else: logger.warning("Não foi possível gerar a análise consolidada vs Entes Públicos.")
-    if arquivos_regionais:
-        logger.info(f"Encontrados {len(arquivos_regionais)} arquivos regionais para análise vs Entes Públicos.")
-        for caminho_csv in arquivos_regionais:
-            nome_analise = caminho_csv.stem.replace('dados_saude_', '')
-            titulo = f"Regional {nome_analise} - vs Entes Públicos"
-            resultados_reg_entes = analisar_frequencias(caminho_csv, COLUNAS_ANALISE, True, COLUNA_NATJUR_PASSIVO, PALAVRAS_CHAVE_ENTES_PUBLICOS)
-            if resultados_reg_entes: resultados_todas_analises[titulo] = resultados_reg_entes
-            else: logger.error(f"Falha análise vs Entes Públicos: {caminho_csv.name}")
-            gc.collect()
-    else: logger.warning(f"Nenhum arquivo CSV encontrado em {PASTA_DADOS_REGIONAIS} para análise regional vs Entes Públicos.")
+    if arquivos_regionais: logger.info(f"Encontrados {len(arquivos_regionais)} arquivos regionais para análise.")
+    else: logger.warning(f"Nenhum arquivo CSV encontrado em {PASTA_DADOS_REGIONAIS} para análise regional.")
+    arquivos = {"Brasil Consolidado": ARQUIVO_DADOS_CONSOLIDADO} # nome -> caminho_csv, na ordem do relatório
+    for caminho_csv in arquivos_regionais:
+        arquivos[f"Regional {caminho_csv.stem.replace('dados_saude_', '')}"] = caminho_csv
+
+    # --- EXECUTA EM PARALELO (um processo por arquivo; cada um produz Geral e vs Entes Públicos) ---
+    logger.info(f"\n=== REALIZANDO ANÁLISES (GERAL E VS ENTES PÚBLICOS) DE {len(arquivos)} ARQUIVOS EM PARALELO ===")
+    resultados_por_nome = {}
+    with ProcessPoolExecutor(max_workers=analise_core.MAX_WORKERS_ANALISE) as executor:
+        futuros = {executor.submit(_worker, caminho_csv): nome for nome, caminho_csv in arquivos.items()}
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            try: resultados_por_nome[nome] = futuro.result()
+            except Exception as e: logger.error(f"Erro no processo de análise '{nome}': {e}", exc_info=True); resultados_por_nome[nome] = None
+
+    # Distribui os dois modos na ordem do relatório (Geral: Brasil e regionais; depois vs Entes Públicos)
+    for modo, sufixo in (('geral', "Geral"), ('entes', "vs Entes Públicos")):
+        for nome in arquivos:
+            titulo = f"{nome} - {sufixo}"
+            resultados_arquivo = resultados_por_nome.get(nome) or {}
+            if resultados_arquivo.get(modo): resultados_todas_analises[titulo] = resultados_arquivo[modo]
+            else: logger.error(f"Falha na análise: {titulo}")
 
     # --- EXPORTAÇÃO FINAL ---
     if resultados_todas_analises:
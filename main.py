@@ -13,12 +13,46 @@ Funcionalidades:
 """
 
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import zipfile
 import logging
 import sys
 import re
-import gc
+import os
+import shutil
+import io
+import mmap
+import csv
+import codecs
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import IO
+from contextlib import closing
+
+import analise_core # prefetch: leitura à frente numa thread (fila limitada)
+
+# Leitura em streaming via PyArrow (parse multi-thread), quando disponível
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pc
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+# Polars é opcional: filtro inteiro como uma consulta em streaming (scan_csv -> filter -> sink_csv)
+try:
+    import polars as pl
+    POLARS_DISPONIVEL = True
+except ImportError:
+    POLARS_DISPONIVEL = False
+
+# charset-normalizer é opcional: sem ele, a amostra é testada como UTF-8 e, se falhar, lida como cp1252
+try:
+    import charset_normalizer
+    CHARSET_NORMALIZER_DISPONIVEL = True
+except ImportError:
+    CHARSET_NORMALIZER_DISPONIVEL = False
 
 # --- Configuração do Logging --- (Igual)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S', handlers=[logging.StreamHandler(sys.stdout)])
@@ -30,6 +64,16 @@ REGIOES = ['NE', 'NO', 'SE', 'SU', 'CO', 'TRFs']
 PASTA_SAIDA_REGIONAL = Path("./Output_AnaliseBR_Saude")
 ARQUIVO_SAIDA_CONSOLIDADO = Path("./DADOS_CNJ_FILTRADOS_SAUDE_CONSOLIDADO.csv")
 CHUNKSIZE_LEITURA = 50000
+BLOCK_SIZE_ARROW = 64 << 20 # Bytes por bloco do leitor PyArrow (cada bloco vira um lote)
+LER_CSV_DIRETO_DO_ZIP = True # Descompacta cada CSV direto no leitor (sem gravar o CSV extraído em disco)
+TAMANHO_BUFFER_EXTRACAO = 4 << 20 # Buffer de 4 MiB na cópia de cada membro do ZIP
+TAMANHO_BUFFER_CONSOLIDACAO = 1 << 20 # Blocos de 1 MiB na concatenação dos CSVs regionais
+MAX_WORKERS_FILTRO = max(1, (os.cpu_count() or 2) // 2) # Processos de filtragem (metade dos núcleos: cada um já usa threads e memória)
+TAMANHO_FILA_LEITURA = 2 # Chunks lidos/filtrados à frente da gravação (fila limitada = memória limitada)
+PREFILTRAR_BYTES = True # Descarta, nos bytes brutos (mmap), as linhas sem nenhum código relevante antes do parse
+LIMITE_PREFILTRO = 0.30 # Acima desta fração do arquivo mantida, o pré-filtro não compensa (leitura completa)
+TAMANHO_AMOSTRA_DIALETO = 1 << 16 # Bytes iniciais usados para detectar encoding e separador
+USAR_POLARS = True # Usa o Polars (se instalado) para filtrar CSVs já extraídos em disco (LER_CSV_DIRETO_DO_ZIP=False ou ZIP sem listagem); membros lidos direto do ZIP usam o leitor em chunks
 
 # --- CONFIGURAÇÃO CRÍTICA: Assuntos e Colunas ---
 # ==============================================================================
@@ -71,6 +115,14 @@ if COLUNA_ASSUNTO_CODIGO not in COLUNAS_RELEVANTES:
 
 # --- Funções Auxiliares ---
 # (encontrar_zip, descompactar_e_encontrar_csv, verificar_assuntos - Mantidas como antes)
+def _list_suffix(pasta: Path, sufixo: str) -> list[Path]:
+    """
+    Lista os arquivos da pasta com o sufixo dado (sem diferenciar maiúsculas) em uma única
+    passagem do os.scandir, ordenados pelo nome (ordem determinística para a consolidação).
+    """
+    with os.scandir(pasta) as entradas:
+        return sorted((Path(entrada.path) for entrada in entradas if entrada.is_file() and entrada.name.lower().endswith(sufixo)), key=lambda caminho: caminho.name)
+
 def encontrar_zip(pasta_regiao: Path) -> Path | None:
     """Encontra o primeiro arquivo .zip dentro da pasta da região."""
     # Esta função agora é menos relevante se processarmos todos os zips no loop main
@@ -78,13 +130,50 @@ def encontrar_zip(pasta_regiao: Path) -> Path | None:
     # Mas vamos mantê-la por enquanto, caso seja útil para encontrar um zip específico se necessário.
     logger.debug(f"Procurando arquivo ZIP em: {pasta_regiao}")
     try:
-        zip_files = list(pasta_regiao.glob('*.zip'))
+        zip_files = _list_suffix(pasta_regiao, '.zip')
         if not zip_files: logger.warning(f"Nenhum .zip encontrado em {pasta_regiao}."); return None
         if len(zip_files) > 1: logger.warning(f"Múltiplos .zip encontrados em {pasta_regiao}. Função encontrar_zip pegará o primeiro: {zip_files[0].name}")
         logger.debug(f"Arquivo ZIP encontrado (pela função encontrar_zip): {zip_files[0].name}")
         return zip_files[0]
     except Exception as e: logger.error(f"Erro ao procurar ZIP em {pasta_regiao}: {e}"); return None
 
+def listar_csvs_no_zip(caminho_zip: Path) -> list[str]:
+    """Retorna os nomes dos membros .csv de um ZIP, sem descompactar nada."""
+    try:
+        with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+            return [nome for nome in zip_ref.namelist() if nome.lower().endswith('.csv')]
+    except zipfile.BadZipFile: logger.error(f"Erro: {caminho_zip.name} não é ZIP válido."); return []
+    except Exception as e: logger.error(f"Erro ao listar CSVs em {caminho_zip.name}: {e}"); return []
+
+def _tamanho_origem(origem: Path | tuple[Path, str]) -> int:
+    """Tamanho (descompactado) da origem de uma tarefa: CSV em disco ou (caminho_zip, nome_membro)."""
+    try:
+        if isinstance(origem, tuple):
+            with zipfile.ZipFile(origem[0], 'r') as zip_ref: return zip_ref.getinfo(origem[1]).file_size
+        return origem.stat().st_size
+    except (OSError, KeyError, zipfile.BadZipFile): return 0
+
+def _extrair_membro(caminho_zip: Path, nome_membro: str, pasta_destino: Path) -> Path:
+    """
+    Extrai um membro do ZIP por streaming (copyfileobj com buffer de 4 MiB).
+
+    Cada chamada abre o próprio ZipFile, então várias podem rodar em threads: a
+    descompressão (zlib) libera o GIL. Nomes absolutos ou com '..' ficam com o
+    zip_ref.extract, que já os sanitiza.
+    """
+    with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+        partes = Path(nome_membro).parts
+        if Path(nome_membro).is_absolute() or '..' in partes:
+            return Path(zip_ref.extract(nome_membro, path=pasta_destino))
+        destino = pasta_destino / nome_membro
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with zip_ref.open(nome_membro, 'r') as origem, open(destino, 'wb') as saida:
+                shutil.copyfileobj(origem, saida, TAMANHO_BUFFER_EXTRACAO)
+        except (NotImplementedError, RuntimeError): # Compressão não suportada / membro criptografado
+            return Path(zip_ref.extract(nome_membro, path=pasta_destino))
+        return destino
+
 def descompactar_e_encontrar_csv(caminho_zip: Path, pasta_destino_csv: Path) -> list[Path]:
     """
     Descompacta um arquivo ZIP e retorna uma LISTA de todos os arquivos .csv encontrados.
@@ -109,46 +198,208 @@ def descompactar_e_encontrar_csv(caminho_zip: Path, pasta_destino_csv: Path) ->
                      logger.info(f"CSVs encontrados após extração completa: {[p.name for p in arquivos_csv_extraidos]}")
                      return arquivos_csv_extraidos
             else:
-                # Extrai apenas os arquivos CSV encontrados
-                for nome_csv in csvs_no_zip:
-                    try:
-                        zip_ref.extract(nome_csv, path=pasta_extracao)
-                        caminho_csv_extraido = pasta_extracao / nome_csv
-                        arquivos_csv_extraidos.append(caminho_csv_extraido)
-                        logger.info(f"CSV extraído para: {caminho_csv_extraido}")
-                    except Exception as extract_err:
-                        logger.error(f"Erro ao extrair {nome_csv} de {caminho_zip.name}: {extract_err}")
+                # Extrai apenas os arquivos CSV encontrados, em paralelo (um membro por thread)
+                with ThreadPoolExecutor(max_workers=min(len(csvs_no_zip), os.cpu_count() or 1)) as executor:
+                    futuros = {executor.submit(_extrair_membro, caminho_zip, nome_csv, pasta_extracao): nome_csv for nome_csv in csvs_no_zip}
+                    for futuro in futuros: # Ordem do ZIP
+                        try:
+                            caminho_csv_extraido = futuro.result()
+                            arquivos_csv_extraidos.append(caminho_csv_extraido)
+                            logger.info(f"CSV extraído para: {caminho_csv_extraido}")
+                        except Exception as extract_err:
+                            logger.error(f"Erro ao extrair {futuros[futuro]} de {caminho_zip.name}: {extract_err}")
                 return arquivos_csv_extraidos
 
     except zipfile.BadZipFile: logger.error(f"Erro: {caminho_zip.name} não é ZIP válido."); return []
     except Exception as e: logger.error(f"Erro ao descompactar/encontrar CSV em {caminho_zip.name}: {e}"); return []
 
 
+_DIGITS_RE = re.compile(r'\d+') # Compilado uma vez (verificar_assuntos roda por linha)
+
 def verificar_assuntos(texto_assuntos: str | float, codigos_relevantes: set) -> bool:
     """Verifica se algum código relevante está na string de assuntos."""
     if pd.isna(texto_assuntos): return False
+    # '\d+' só casa dígitos: int() nunca falha aqui
+    codigos_extraidos_int = {int(codigo_str) for codigo_str in _DIGITS_RE.findall(str(texto_assuntos))}
+    if not codigos_extraidos_int: return False
+    return not codigos_extraidos_int.isdisjoint(codigos_relevantes)
+
+
+def _alternacao_codigos(codigos_relevantes: set) -> str:
+    """Códigos como alternação de regex, mais longos primeiro."""
+    return '|'.join(sorted(map(str, codigos_relevantes), key=len, reverse=True))
+
+def compilar_padrao_codigos(codigos_relevantes: set) -> re.Pattern:
+    """
+    Compila os códigos em uma alternação com fronteira numérica (equivale a verificar_assuntos).
+
+    '(?<!\d)' e '(?!\d)' impedem casar parte de outro número (12480 em 124800); '0*' aceita
+    zeros à esquerda, como a conversão para int fazia.
+    """
+    return re.compile(rf'(?<!\d)0*(?:{_alternacao_codigos(codigos_relevantes)})(?!\d)')
+
+def padrao_codigos_arrow(codigos_relevantes: set) -> str:
+    """Mesmo padrão de compilar_padrao_codigos para o RE2 do Arrow e o regex do Polars (sem lookaround: fronteira consumida)."""
+    return rf'(^|[^0-9])0*(?:{_alternacao_codigos(codigos_relevantes)})([^0-9]|$)'
+
+
+_DIALETOS_DETECTADOS = {} # (caminho, tamanho, mtime) -> (encoding, separador)
+
+def _detectar_encoding(amostra: bytes) -> str:
+    """Encoding da amostra (nome canônico do codecs); ASCII é tratado como UTF-8."""
+    encoding = None
+    if CHARSET_NORMALIZER_DISPONIVEL:
+        melhor = charset_normalizer.from_bytes(amostra).best()
+        encoding = melhor.encoding if melhor else None
+    if encoding is None:
+        try:
+            amostra.decode('utf-8', errors='strict'); encoding = 'utf-8'
+        except UnicodeDecodeError as e:
+            # Amostra cortada no meio de um caractere multibyte ainda é UTF-8
+            encoding = 'utf-8' if e.start >= len(amostra) - 3 and e.reason.startswith('unexpected end') else 'cp1252'
+    encoding = codecs.lookup(encoding).name
+    return 'utf-8' if encoding == 'ascii' else encoding
+
+def detectar_dialeto_csv(caminho_csv: Path | IO[bytes]) -> tuple[str, str]:
+    """
+    Detecta (encoding, separador) pelos primeiros TAMANHO_AMOSTRA_DIALETO bytes.
+
+    Fluxos voltam ao início após a amostra. Arquivos em disco ficam em cache pelo
+    caminho + tamanho + mtime. Em caso de dúvida no separador, mantém ';'.
+    """
+    chave = None
+    if isinstance(caminho_csv, Path):
+        stat = caminho_csv.stat()
+        chave = (str(caminho_csv.resolve()), stat.st_size, stat.st_mtime_ns)
+        if chave in _DIALETOS_DETECTADOS: return _DIALETOS_DETECTADOS[chave]
+        with open(caminho_csv, 'rb') as f: amostra = f.read(TAMANHO_AMOSTRA_DIALETO)
+    else:
+        amostra = caminho_csv.read(TAMANHO_AMOSTRA_DIALETO); caminho_csv.seek(0)
+
+    encoding = _detectar_encoding(amostra)
+    texto = amostra.decode(encoding, errors='replace')
+    if len(amostra) == TAMANHO_AMOSTRA_DIALETO and '\n' in texto: texto = texto[:texto.rfind('\n')] # Só linhas completas
     try:
-        texto_assuntos_str = str(texto_assuntos)
-        codigos_extraidos_str = re.findall(r'\d+', texto_assuntos_str)
-        if not codigos_extraidos_str: return False
-        codigos_extraidos_int = set()
-        for codigo_str in codigos_extraidos_str:
-            try: codigos_extraidos_int.add(int(codigo_str))
-            except ValueError: continue
-        return not codigos_extraidos_int.isdisjoint(codigos_relevantes)
-    except Exception as e: logger.debug(f"Erro ao processar assunto '{texto_assuntos}': {e}"); return False
+        separador = csv.Sniffer().sniff(texto, delimiters=';,\t|').delimiter
+    except csv.Error:
+        separador = ';'
+    if chave is not None: _DIALETOS_DETECTADOS[chave] = (encoding, separador)
+    return encoding, separador
+
+def _tem_quebra_entre_aspas(dados, tamanho_bloco: int = 8 << 20) -> bool:
+    """
+    Indica se alguma linha física tem número ímpar de aspas (campo entre aspas atravessando linhas).
+
+    Paridade acumulada das aspas em cada '\\n', em blocos (numpy, sem cópia do mmap): se ela é
+    sempre par, toda linha começa fora de aspas e linha física coincide com registro.
+    """
+    if dados.find(b'"') == -1: return False
+    paridade = 0
+    for inicio in range(0, len(dados), tamanho_bloco):
+        bloco = np.frombuffer(dados, dtype=np.uint8, count=min(tamanho_bloco, len(dados) - inicio), offset=inicio)
+        aspas = np.cumsum(bloco == ord('"'), dtype=np.uint8) + paridade # uint8 estoura, mas preserva a paridade
+        if (aspas[bloco == ord('\n')] & 1).any(): return True
+        paridade = int(aspas[-1]) & 1
+    return paridade == 1 # Última linha sem '\\n' final
+
+def _prefiltrar_bytes(caminho_csv: Path, codigos_relevantes: set, encoding: str = 'utf-8') -> io.BytesIO | None:
+    """
+    Pré-filtro grosseiro nos bytes brutos: mantém o cabeçalho e só as linhas em que algum código aparece.
+
+    A busca olha a linha inteira (superconjunto do filtro por coluna, que continua sendo aplicado
+    depois). Retorna None (leitura completa) se o arquivo estiver vazio, se a fração mantida passar
+    de LIMITE_PREFILTRO ou se algum campo entre aspas atravessar linhas: nesse caso linha física e
+    registro não coincidem e cortar por linha corromperia os registros.
+    """
+    if '0123456789\n'.encode(encoding) != b'0123456789\n': return None # Dígitos não são bytes ASCII (ex.: UTF-16)
+    padrao = re.compile(rb'(?<![0-9])0*(?:' + _alternacao_codigos(codigos_relevantes).encode() + rb')(?![0-9])')
+    with open(caminho_csv, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0: return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            tamanho = len(mm)
+            pos = mm.find(b'\n') + 1
+            if pos == 0: return None # Só cabeçalho, sem quebra de linha
+            if _tem_quebra_entre_aspas(mm):
+                logger.info(f"Pré-filtro de bytes ignorado em '{caminho_csv.name}': há campos entre aspas com quebra de linha.")
+                return None
+            partes = [mm[:pos]]; mantidos = 0; limite = int(tamanho * LIMITE_PREFILTRO)
+            while (m := padrao.search(mm, pos)):
+                inicio = mm.rfind(b'\n', pos, m.start()) + 1 or pos # Início da linha do acerto
+                fim = mm.find(b'\n', m.end())
+                fim = tamanho if fim == -1 else fim + 1
+                partes.append(mm[inicio:fim]); mantidos += fim - inicio
+                if mantidos > limite: return None
+                pos = fim # Continua a busca na linha seguinte
+    logger.info(f"Pré-filtro de bytes em '{caminho_csv.name}': {mantidos:,} de {tamanho:,} bytes mantidos ({mantidos / tamanho:.1%}).")
+    buffer = io.BytesIO(b''.join(partes))
+    buffer.name = caminho_csv.name # Usado nas mensagens de log dos leitores
+    return buffer
+
+def _filtrar_csv_polars(caminho_csv: Path, caminho_saida_csv: Path, colunas_saida: list, coluna_assunto: str, codigos_relevantes: set, sep: str = ';') -> int:
+    """Filtra o CSV com uma consulta preguiçosa do Polars gravada em streaming; retorna as linhas gravadas."""
+    (
+        pl.scan_csv(caminho_csv, separator=sep, encoding='utf8', infer_schema=False) # Tudo como texto
+        .filter(pl.col(coluna_assunto).str.contains(padrao_codigos_arrow(codigos_relevantes))) # Nulo -> descartado
+        .select(colunas_saida) # Projeção empurrada para o leitor
+        .sink_csv(caminho_saida_csv, separator=';')
+    )
+    return pl.scan_csv(caminho_saida_csv, separator=';', infer_schema=False).select(pl.len()).collect().item()
+
+def _filtrar_chunks_arrow(caminho_csv: Path, colunas_para_ler: list, colunas_saida: list, coluna_assunto: str, codigos_relevantes: set, encoding: str = 'utf-8', sep: str = ';'):
+    """Lê o CSV em lotes Arrow (streaming), filtra no próprio Arrow e gera (linhas_lidas, lote_filtrado)."""
+    def _linha_invalida(linha):
+        logger.warning(f"Linha malformada ignorada em '{caminho_csv.name}' (linha {linha.number}): {linha.text[:200]!r}")
+        return 'skip' # Equivale ao on_bad_lines='warn' do pandas
+
+    leitor = pa_csv.open_csv(
+        caminho_csv,
+        read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE_ARROW, encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=sep, invalid_row_handler=_linha_invalida),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=colunas_para_ler, column_types={col: pa.string() for col in colunas_para_ler},
+            strings_can_be_null=True, null_values=[''] # Célula vazia = nulo: gravada vazia (sem aspas) pelo CSVWriter
+        )
+    )
+    padrao = padrao_codigos_arrow(codigos_relevantes)
+    for lote in leitor:
+        # Regex só nos valores distintos do dicionário; a máscara por linha sai de um take pelos índices
+        assuntos = lote.column(coluna_assunto).dictionary_encode()
+        mascara = pc.take(pc.match_substring_regex(assuntos.dictionary, padrao), assuntos.indices) # Nulo -> descartado pelo filter
+        yield lote.num_rows, lote.filter(mascara).select(colunas_saida) # Continua em Arrow (gravado pelo CSVWriter)
+
+def _filtrar_chunks_pandas(caminho_csv: Path, colunas_para_ler: list, colunas_saida: list, coluna_assunto: str, codigos_relevantes: set, chunksize: int, encoding: str = 'utf-8', sep: str = ';'):
+    """Lê o CSV em chunks do pandas, filtra e gera (linhas_lidas, chunk_filtrado)."""
+    iterador_csv = pd.read_csv(
+        caminho_csv,
+        sep=sep,            # Detectados por detectar_dialeto_csv
+        encoding=encoding,
+        usecols=colunas_para_ler, # Usa a lista validada
+        dtype={col: 'str' for col in colunas_para_ler}, # Lê como string
+        chunksize=chunksize,
+        low_memory=False,
+        on_bad_lines='warn'
+    )
+    padrao_codigos = compilar_padrao_codigos(codigos_relevantes) # Compilado uma vez, fora do loop
+    for chunk in iterador_csv:
+        # Combinações de assuntos se repetem muito: a busca roda uma vez por categoria, não por linha
+        assuntos = chunk[coluna_assunto].astype('category')
+        # Bitmap indexado pelo código da categoria; a posição extra (False) atende o código -1 (célula vazia)
+        assunto_relevante = np.append(np.asarray(assuntos.cat.categories.str.contains(padrao_codigos), dtype=bool), False)
+        condicao = assunto_relevante[assuntos.cat.codes.to_numpy()]
+        # Seleciona apenas as colunas finais desejadas APÓS o filtro
+        yield len(chunk), chunk.loc[condicao, colunas_saida].copy()
 
 
 # --- Função de Filtragem Revisada ---
 def filtrar_csv_por_assunto(
-    caminho_csv: Path,
+    caminho_csv: Path | IO[bytes], # Arquivo em disco ou fluxo binário (membro aberto de um ZIP)
     caminho_saida_csv: Path,
     codigos_assunto_relevantes: set,
     coluna_assunto: str,
     colunas_manter: list, # Nomes como definidos pelo usuário
     chunksize: int
 ):
-    """Lê CSV em chunks, verifica cabeçalho, filtra por assuntos e salva."""
+    """Lê CSV em chunks (de um arquivo ou de um fluxo), verifica cabeçalho, filtra por assuntos e salva."""
     logger.info(f"Iniciando processamento de: {caminho_csv.name}")
     logger.info(f"Salvando resultado filtrado em: {caminho_saida_csv.name}")
 
@@ -158,27 +409,24 @@ def filtrar_csv_por_assunto(
     caminho_saida_csv.parent.mkdir(parents=True, exist_ok=True)
 
     try:
+        # 0. Detectar encoding e separador uma vez pela amostra inicial (em vez de assumir ; e UTF-8)
+        encoding, sep = detectar_dialeto_csv(caminho_csv)
+        logger.info(f"Dialeto detectado em '{caminho_csv.name}': encoding={encoding}, separador={sep!r}")
+
         # 1. Ler APENAS o cabeçalho para verificar os nomes reais das colunas
         try:
-            # Tenta ler com separador e encoding mais prováveis
-            df_header = pd.read_csv(caminho_csv, sep=';', encoding='utf-8', nrows=0, low_memory=False)
+            df_header = pd.read_csv(caminho_csv, sep=sep, encoding=encoding, nrows=0, low_memory=False)
+            if not isinstance(caminho_csv, Path): caminho_csv.seek(0) # Fluxo: volta ao início para a leitura completa
             colunas_reais_csv = [col.strip() for col in df_header.columns] # Remove espaços extras
             logger.info(f"Colunas reais encontradas em '{caminho_csv.name}': {colunas_reais_csv}")
         except Exception as header_err:
-            logger.error(f"Falha ao ler cabeçalho de '{caminho_csv.name}'. Verifique separador (;) e encoding (utf-8). Erro: {header_err}")
+            logger.error(f"Falha ao ler cabeçalho de '{caminho_csv.name}'. Verifique separador ({sep!r}) e encoding ({encoding}). Erro: {header_err}")
             return # Não pode continuar sem o cabeçalho
 
-        # 2. Validar as colunas solicitadas contra as colunas reais
-        colunas_manter_ajustado = []
-        colunas_faltantes = []
-        mapa_nomes = {col.strip(): col.strip() for col in colunas_reais_csv} # Mapeamento simples inicial
-
-        # Verifica se todas as colunas relevantes existem (ignorando espaços extras)
-        for col_solicitada in colunas_manter:
-            if col_solicitada in mapa_nomes:
-                colunas_manter_ajustado.append(col_solicitada)
-            else:
-                colunas_faltantes.append(col_solicitada)
+        # 2. Validar as colunas solicitadas contra as colunas reais (ignorando espaços extras)
+        colunas_csv_set = set(colunas_reais_csv)
+        colunas_faltantes = [col for col in colunas_manter if col not in colunas_csv_set]
+        colunas_manter_ajustado = [col for col in colunas_manter if col in colunas_csv_set]
 
         if colunas_faltantes:
             logger.error(f"ERRO DE COLUNA em '{caminho_csv.name}'!")
@@ -188,7 +436,7 @@ def filtrar_csv_por_assunto(
             return # Interrompe o processamento deste arquivo
 
         # Verifica a coluna de assunto separadamente
-        if coluna_assunto not in mapa_nomes:
+        if coluna_assunto not in colunas_csv_set:
             logger.error(f"ERRO: Coluna de assunto '{coluna_assunto}' definida em COLUNA_ASSUNTO_CODIGO não encontrada no CSV '{caminho_csv.name}'.")
             logger.error(f"Colunas disponíveis: {colunas_reais_csv}")
             return
@@ -196,97 +444,128 @@ def filtrar_csv_por_assunto(
         # Colunas que realmente precisamos ler (filtro + manter)
         colunas_para_ler = list(set([coluna_assunto] + colunas_manter_ajustado))
 
-        # 3. Definir dtypes (ler tudo como string é mais seguro inicialmente)
-        dtypes_leitura = {col: 'str' for col in colunas_para_ler}
-
-        # 4. Ler o arquivo em Chunks com colunas validadas
+        # 3. Ler o arquivo (PyArrow em streaming ou chunks do pandas), já filtrando por assunto
         logger.info(f"Lendo e filtrando '{caminho_csv.name}'...")
-        iterador_csv = pd.read_csv(
-            caminho_csv,
-            sep=';',            # ASSUMINDO ; - AJUSTE SE NECESSÁRIO
-            encoding='utf-8', # ASSUMINDO Latin-1 - AJUSTE SE NECESSÁRIO
-            usecols=colunas_para_ler, # Usa a lista validada
-            dtype=dtypes_leitura,     # Lê como string
-            chunksize=chunksize,
-            low_memory=False,
-            on_bad_lines='warn'
-        )
-
-        # 5. Processar Chunks
-        for i, chunk in enumerate(iterador_csv):
-            total_linhas_lidas += len(chunk)
-            logger.debug(f"Processando chunk {i+1}...")
-
-            condicao = chunk[coluna_assunto].apply(
-                verificar_assuntos,
-                args=(codigos_assunto_relevantes,)
-            )
-
-            # Seleciona apenas as colunas finais desejadas APÓS o filtro
-            chunk_filtrado = chunk.loc[condicao, colunas_manter_ajustado].copy()
-
-            if not chunk_filtrado.empty:
-                total_linhas_filtradas += len(chunk_filtrado)
-                mode = 'w' if primeiro_chunk else 'a'
-                header = primeiro_chunk
-                chunk_filtrado.to_csv(
-                    caminho_saida_csv, sep=';', encoding='utf-8', index=False,
-                    mode=mode, header=header
-                )
-                primeiro_chunk = False
-
-            del chunk, chunk_filtrado, condicao
-            if i % 5 == 0: gc.collect()
+        filtrado_polars = False
+        if USAR_POLARS and POLARS_DISPONIVEL and isinstance(caminho_csv, Path) and encoding == 'utf-8': # scan_csv: só arquivos e só UTF-8
+            try:
+                total_linhas_filtradas = _filtrar_csv_polars(caminho_csv, caminho_saida_csv, colunas_manter_ajustado, coluna_assunto, codigos_assunto_relevantes, sep)
+                total_linhas_lidas = None; filtrado_polars = True # sink_csv não informa as linhas lidas
+            except Exception as polars_err:
+                logger.warning(f"Falha no Polars ao filtrar '{caminho_csv.name}': {polars_err}. Usando o leitor em chunks.")
+        entrada_csv = caminho_csv
+        if not filtrado_polars and PREFILTRAR_BYTES and isinstance(caminho_csv, Path): # mmap só em arquivos, não em fluxos do ZIP
+            try:
+                entrada_csv = _prefiltrar_bytes(caminho_csv, codigos_assunto_relevantes, encoding) or caminho_csv
+            except (OSError, ValueError) as mmap_err:
+                logger.warning(f"Pré-filtro de bytes indisponível para '{caminho_csv.name}': {mmap_err}. Lendo o arquivo inteiro.")
+        if not filtrado_polars and PYARROW_DISPONIVEL:
+            # 4a. Lotes Arrow (lidos/filtrados numa thread à frente) gravados pelo CSVWriter (C++), sem passar pelo pandas; cabeçalho escrito na abertura
+            esquema_saida = pa.schema([(col, pa.string()) for col in colunas_manter_ajustado])
+            lotes = analise_core.prefetch(_filtrar_chunks_arrow(entrada_csv, colunas_para_ler, colunas_manter_ajustado, coluna_assunto, codigos_assunto_relevantes, encoding, sep), TAMANHO_FILA_LEITURA)
+            with pa_csv.CSVWriter(caminho_saida_csv, esquema_saida, write_options=pa_csv.WriteOptions(delimiter=';', batch_size=65536)) as escritor, closing(lotes): # closing: erro na gravação encerra a leitura
+                for i, (linhas_lidas, lote_filtrado) in enumerate(lotes):
+                    total_linhas_lidas += linhas_lidas
+                    logger.debug(f"Processando chunk {i+1}...")
+                    if lote_filtrado.num_rows:
+                        total_linhas_filtradas += lote_filtrado.num_rows
+                        escritor.write(lote_filtrado)
+        elif not filtrado_polars:
+            # 4b. Chunks do pandas (lidos/filtrados numa thread à frente; arquivo de saída aberto uma única vez, buffer de 1 MiB)
+            chunks = analise_core.prefetch(_filtrar_chunks_pandas(entrada_csv, colunas_para_ler, colunas_manter_ajustado, coluna_assunto, codigos_assunto_relevantes, chunksize, encoding, sep), TAMANHO_FILA_LEITURA)
+            with open(caminho_saida_csv, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f_out, closing(chunks):
+                for i, (linhas_lidas, chunk_filtrado) in enumerate(chunks):
+                    total_linhas_lidas += linhas_lidas
+                    logger.debug(f"Processando chunk {i+1}...")
+
+                    if not chunk_filtrado.empty:
+                        total_linhas_filtradas += len(chunk_filtrado)
+                        chunk_filtrado.to_csv(f_out, sep=';', index=False, header=primeiro_chunk) # Cabeçalho só no primeiro
+                        primeiro_chunk = False
+
+                    del chunk_filtrado # Contagem de referências libera o chunk; sem gc.collect() no loop
 
         logger.info(f"Filtragem de {caminho_csv.name} concluída.")
-        logger.info(f"Total de linhas lidas: {total_linhas_lidas}")
+        if filtrado_polars: logger.info("Total de linhas lidas: n/d (filtrado pelo Polars)")
+        else: logger.info(f"Total de linhas lidas: {total_linhas_lidas}")
         logger.info(f"Total de linhas filtradas (Saúde Pública): {total_linhas_filtradas}")
-        # (Remoção de arquivo vazio - mantida como antes)
+        # Remoção de arquivo vazio (Polars e CSVWriter gravam o cabeçalho mesmo sem linhas)
         if total_linhas_filtradas == 0 and caminho_saida_csv.exists():
-            if caminho_saida_csv.stat().st_size < 100 : # Se for muito pequeno (provavelmente só cabeçalho)
-                 try: caminho_saida_csv.unlink(); logger.info(f"Arquivo vazio/cabeçalho removido: {caminho_saida_csv.name}")
-                 except OSError as e: logger.warning(f"Não remover arquivo vazio {caminho_saida_csv.name}: {e}")
+            try: caminho_saida_csv.unlink(); logger.info(f"Arquivo vazio/cabeçalho removido: {caminho_saida_csv.name}")
+            except OSError as e: logger.warning(f"Não remover arquivo vazio {caminho_saida_csv.name}: {e}")
 
     except Exception as e:
         logger.error(f"Erro inesperado durante leitura/filtragem de '{caminho_csv.name}': {e}", exc_info=True)
 
 
 # (Função consolidar_csvs_regionais - Mantida como antes)
-def consolidar_csvs_regionais(pasta_csvs_regionais: Path, arquivo_saida_consolidado: Path, chunksize: int):
-    """Lê todos os CSVs filtrados por região e os consolida em um único arquivo."""
+def consolidar_csvs_regionais(pasta_csvs_regionais: Path, arquivo_saida_consolidado: Path):
+    """
+    Concatena os CSVs filtrados por região em um único arquivo.
+
+    Cópia direta dos bytes (sem parse/reescrita pelo pandas): o cabeçalho vem do
+    primeiro arquivo e é pulado nos demais, que têm as mesmas colunas.
+    """
     logger.info("--- Iniciando Consolidação dos CSVs Regionais Filtrados ---")
     logger.info(f"Procurando arquivos CSV em: {pasta_csvs_regionais}")
     logger.info(f"Salvando consolidado em: {arquivo_saida_consolidado}")
-    arquivos_csv_regionais = list(pasta_csvs_regionais.glob("*.csv"))
+    arquivos_csv_regionais = _list_suffix(pasta_csvs_regionais, '.csv')
     if not arquivos_csv_regionais: logger.warning("Nenhum CSV regional encontrado."); return
     primeiro_arquivo = True; total_linhas_consolidadas = 0
     arquivo_saida_consolidado.parent.mkdir(parents=True, exist_ok=True)
     try:
-        with open(arquivo_saida_consolidado, 'w', encoding='utf-8', newline='') as f_out:
+        with open(arquivo_saida_consolidado, 'wb') as f_out:
             for caminho_csv_regional in arquivos_csv_regionais:
                 logger.info(f"Processando arquivo regional: {caminho_csv_regional.name}")
                 try:
-                    iterador_regional = pd.read_csv(caminho_csv_regional, sep=';', encoding='utf-8', chunksize=chunksize, low_memory=False, dtype=str) # Ler como string por segurança
-                    for i, chunk in enumerate(iterador_regional):
-                        if chunk.empty: continue
-                        total_linhas_consolidadas += len(chunk)
-                        header = primeiro_arquivo and i == 0
-                        chunk.to_csv(f_out, sep=';', encoding='utf-8', index=False, header=header)
-                        primeiro_arquivo = False
-                        del chunk; gc.collect() if i % 10 == 0 else None
-                    del iterador_regional; gc.collect()
+                    with open(caminho_csv_regional, 'rb') as f_in:
+                        cabecalho = f_in.readline()
+                        if primeiro_arquivo: f_out.write(cabecalho); primeiro_arquivo = False
+                        # Mesmo laço do shutil.copyfileobj (blocos de 1 MiB), contando as linhas na passagem
+                        ultimo_bloco = b''
+                        while bloco := f_in.read(TAMANHO_BUFFER_CONSOLIDACAO):
+                            f_out.write(bloco); total_linhas_consolidadas += bloco.count(b'\n'); ultimo_bloco = bloco
+                        if ultimo_bloco and not ultimo_bloco.endswith(b'\n'): # Arquivo sem quebra final: não emendar com o próximo
+                            f_out.write(b'\n'); total_linhas_consolidadas += 1
                 except Exception as e_inner: logger.error(f"Erro ao processar regional '{caminho_csv_regional.name}': {e_inner}", exc_info=True)
         logger.info(f"Consolidação concluída. Total de {total_linhas_consolidadas} linhas salvas em {arquivo_saida_consolidado.name}")
     except Exception as e_outer: logger.error(f"Erro inesperado na consolidação: {e_outer}", exc_info=True)
 
 
 # --- Função Main Revisada ---
+def _filter_one(tarefa: tuple[Path | tuple[Path, str], Path]):
+    """
+    Filtra um CSV (executado em um processo do pool).
+
+    A origem é o caminho de um CSV extraído ou (caminho_zip, nome_membro): nesse caso o
+    membro é aberto aqui mesmo e descompactado direto no leitor, sem arquivo intermediário.
+    """
+    origem, arquivo_saida_regional = tarefa
+    parametros = (arquivo_saida_regional, CODIGOS_SAUDE_RELEVANTES, COLUNA_ASSUNTO_CODIGO, COLUNAS_RELEVANTES, CHUNKSIZE_LEITURA)
+    if isinstance(origem, tuple):
+        caminho_zip, nome_membro = origem
+        logger.info(f"Processando arquivo CSV: {nome_membro} (direto de {caminho_zip.name})")
+        with zipfile.ZipFile(caminho_zip, 'r') as zip_ref, zip_ref.open(nome_membro, 'r') as fluxo_csv: # Fecha o membro mesmo em erro
+            filtrar_csv_por_assunto(fluxo_csv, *parametros)
+        return
+    caminho_csv_original = origem
+    logger.info(f"Processando arquivo CSV: {caminho_csv_original.name}")
+    filtrar_csv_por_assunto(caminho_csv_original, *parametros)
+    # Opcional: Remover CSV original após processamento bem-sucedido
+    # try:
+    #     caminho_csv_original.unlink()
+    #     logger.info(f"CSV original removido: {caminho_csv_original.name}")
+    # except OSError as e:
+    #     logger.warning(f"Não remover CSV original {caminho_csv_original.name}: {e}")
+
+
 def main():
     """Função principal que orquestra a descompactação, filtragem e consolidação."""
     logger.info(">>> INICIANDO PROCESSAMENTO CNJ - FILTRO SAÚDE PÚBLICA <<<")
     PASTA_SAIDA_REGIONAL.mkdir(parents=True, exist_ok=True)
 
-    # 1. Processa cada região
+    # 1. Descompacta os ZIPs de cada região e monta a lista de CSVs a filtrar
+    tarefas = [] # (caminho_csv_original ou (caminho_zip, nome_membro), arquivo_saida_regional)
     for regiao in REGIOES:
         logger.info(f"--- Processando Região: {regiao} ---")
         pasta_regiao_atual = PASTA_BASE_DADOS / regiao
@@ -296,7 +575,7 @@ def main():
             continue
 
         # *** NOVO: Itera sobre TODOS os arquivos ZIP na pasta ***
-        arquivos_zip_na_regiao = list(pasta_regiao_atual.glob('*.zip'))
+        arquivos_zip_na_regiao = _list_suffix(pasta_regiao_atual, '.zip')
         if not arquivos_zip_na_regiao:
             logger.warning(f"Nenhum arquivo ZIP encontrado em {pasta_regiao_atual}. Pulando região.")
             continue
@@ -304,6 +583,14 @@ def main():
         for caminho_zip in arquivos_zip_na_regiao:
             logger.info(f"Processando arquivo ZIP: {caminho_zip.name}")
 
+            # CSVs na listagem do ZIP: lidos direto do ZIP pelo processo de filtragem
+            membros_csv = listar_csvs_no_zip(caminho_zip) if LER_CSV_DIRETO_DO_ZIP else []
+            if membros_csv:
+                for nome_membro in membros_csv:
+                    nome_saida = f"dados_saude_{regiao}_{Path(nome_membro).stem}.csv"
+                    tarefas.append(((caminho_zip, nome_membro), PASTA_SAIDA_REGIONAL / nome_saida))
+                continue
+
             # Descompacta o ZIP e encontra TODOS os CSVs dentro dele
             lista_csvs_extraidos = descompactar_e_encontrar_csv(caminho_zip, pasta_regiao_atual)
 
@@ -313,32 +600,25 @@ def main():
 
             # *** NOVO: Itera sobre TODOS os CSVs extraídos de um ZIP ***
             for caminho_csv_original in lista_csvs_extraidos:
-                logger.info(f"Processando arquivo CSV: {caminho_csv_original.name}")
-
                 # Define nome do arquivo de saída (inclui nome original para evitar colisão)
                 nome_saida = f"dados_saude_{regiao}_{caminho_csv_original.stem}.csv" # Usa o nome do csv sem extensão
-                arquivo_saida_regional = PASTA_SAIDA_REGIONAL / nome_saida
-
-                # Filtra o CSV pelos códigos de assunto
-                filtrar_csv_por_assunto(
-                    caminho_csv_original,
-                    arquivo_saida_regional,
-                    CODIGOS_SAUDE_RELEVANTES,
-                    COLUNA_ASSUNTO_CODIGO,
-                    COLUNAS_RELEVANTES,
-                    CHUNKSIZE_LEITURA
-                )
-                # Opcional: Remover CSV original após processamento bem-sucedido
-                # try:
-                #     caminho_csv_original.unlink()
-                #     logger.info(f"CSV original removido: {caminho_csv_original.name}")
-                # except OSError as e:
-                #     logger.warning(f"Não remover CSV original {caminho_csv_original.name}: {e}")
-
-            gc.collect() # Tenta limpar memória entre ZIPs
-
-    # 2. Consolida os arquivos regionais filtrados
-    consolidar_csvs_regionais(PASTA_SAIDA_REGIONAL, ARQUIVO_SAIDA_CONSOLIDADO, CHUNKSIZE_LEITURA)
+                tarefas.append((caminho_csv_original, PASTA_SAIDA_REGIONAL / nome_saida))
+
+    # 2. Filtra os CSVs em paralelo (cada arquivo é independente); os maiores entram primeiro no pool
+    tarefas.sort(key=lambda tarefa: _tamanho_origem(tarefa[0]), reverse=True)
+    logger.info(f"--- Filtrando {len(tarefas)} CSVs em até {MAX_WORKERS_FILTRO} processos ---")
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS_FILTRO) as executor:
+        futuros = {}
+        for origem, arquivo_saida_regional in tarefas:
+            # Nome para o log: a origem pode ser um caminho ou (caminho_zip, nome_membro)
+            descricao = f"{origem[0].name}:{origem[1]}" if isinstance(origem, tuple) else origem.name
+            futuros[executor.submit(_filter_one, (origem, arquivo_saida_regional))] = descricao
+        for futuro in as_completed(futuros):
+            try: futuro.result()
+            except Exception as e: logger.error(f"Erro no processo de filtragem de '{futuros[futuro]}': {e}", exc_info=True)
+
+    # 3. Consolida os arquivos regionais filtrados
+    consolidar_csvs_regionais(PASTA_SAIDA_REGIONAL, ARQUIVO_SAIDA_CONSOLIDADO)
 
     logger.info(">>> PROCESSAMENTO CONCLUÍDO <<<")
 
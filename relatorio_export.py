@@ -6,8 +6,11 @@ para arquivos CSV e PDF.
 """
 
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import logging
+import csv
+from functools import lru_cache
 from fpdf import FPDF # Importa a biblioteca FPDF
 
 logger = logging.getLogger(__name__)
@@ -51,47 +54,28 @@ def formatar_tabela_analise(
     soma_top_n = top_n_contagens.sum()
     contagem_outros = total_validas - soma_top_n
 
-    # Prepara DataFrame para exibição
-    if not top_n_contagens.empty:
-        df_tabela = pd.DataFrame({
-            'Item': top_n_contagens.index.astype(str),
-            'Contagem': top_n_contagens.values
-        })
-        # Calcula Percentual para Top N (relativo ao total GERAL)
-        df_tabela['Percentual'] = (df_tabela['Contagem'] / total_ocorrencias * 100).map('{:.2f}%'.format) if total_ocorrencias > 0 else '0.00%'
-    else:
-        df_tabela = pd.DataFrame(columns=['Item', 'Contagem', 'Percentual'])
+    # Monta todas as linhas em uma lista e cria o DataFrame uma única vez (sem pd.concat a cada linha)
+    # Percentual do Top N relativo ao total GERAL (total zero já retornou acima)
+    percentuais_top_n = np.char.mod('%.2f%%', top_n_contagens.to_numpy() / total_ocorrencias * 100)
+    linhas = [
+        {'Item': item, 'Contagem': contagem, 'Percentual': percentual}
+        for item, contagem, percentual in zip(top_n_contagens.index.astype(str), top_n_contagens.tolist(), percentuais_top_n.tolist())
+    ]
 
     # Adiciona linha 'Outros', se houver itens válidos além do Top N
     if total_itens_unicos_validos > top_n and contagem_outros > 0:
-        percentual_outros = (contagem_outros / total_ocorrencias * 100) if total_ocorrencias > 0 else 0
-        outros_row = pd.DataFrame({
-            'Item': [f'Outros ({total_itens_unicos_validos - top_n} itens)'],
-            'Contagem': [contagem_outros],
-            'Percentual': [f'{percentual_outros:.2f}%']
-        })
-        df_tabela = pd.concat([df_tabela, outros_row], ignore_index=True)
+        linhas.append({'Item': f'Outros ({total_itens_unicos_validos - top_n} itens)', 'Contagem': contagem_outros, 'Percentual': f'{contagem_outros / total_ocorrencias * 100:.2f}%'})
 
     # Adiciona linha 'Sigiloso', se houver
     if contagem_sigiloso > 0:
-        perc_sigiloso = (contagem_sigiloso / total_ocorrencias * 100) if total_ocorrencias > 0 else 0
-        sigiloso_row = pd.DataFrame({
-            'Item': ['Sigiloso'],
-            'Contagem': [contagem_sigiloso],
-            'Percentual': [f'{perc_sigiloso:.2f}%']
-        })
-        df_tabela = pd.concat([df_tabela, sigiloso_row], ignore_index=True)
-
-    # Adiciona linha 'TOTAL GERAL' se houver dados na tabela
-    if not df_tabela.empty:
-        total_row = pd.DataFrame({
-            'Item': ['TOTAL GERAL'],
-            'Contagem': [total_ocorrencias],
-            'Percentual': ['100.00%']
-        })
-        df_tabela = pd.concat([df_tabela, total_row], ignore_index=True)
-
-    return df_tabela if not df_tabela.empty else None
+        linhas.append({'Item': 'Sigiloso', 'Contagem': contagem_sigiloso, 'Percentual': f'{contagem_sigiloso / total_ocorrencias * 100:.2f}%'})
+
+    if not linhas:
+        return None
+
+    # Adiciona linha 'TOTAL GERAL'
+    linhas.append({'Item': 'TOTAL GERAL', 'Contagem': total_ocorrencias, 'Percentual': '100.00%'})
+    return pd.DataFrame(linhas, columns=['Item', 'Contagem', 'Percentual'])
 
 
 # --- Funções de Exportação ---
@@ -111,37 +95,28 @@ def exportar_analises_csv(
     """
     logger.info(f"Iniciando exportação da análise para CSV: {arquivo_saida_csv.name}")
     arquivo_saida_csv.parent.mkdir(parents=True, exist_ok=True)
-    primeira_tabela = True
 
     try:
         with open(arquivo_saida_csv, 'w', encoding='utf-8', newline='') as f_out:
+            # Um único writer para o arquivo todo (em vez de um DataFrame.to_csv por tabela)
+            writer = csv.writer(f_out, delimiter=';', lineterminator='\n')
             for titulo, resultados_completos in resultados_por_contexto.items():
                 if not resultados_completos: continue
 
                 # Escreve o título do contexto no CSV (como linha separada)
-                f_out.write(f"\n=== {titulo.upper()} ===\n") # Linha de título
+                writer.writerow([]); writer.writerow([f"=== {titulo.upper()} ==="]) # Linha de título
 
                 for coluna, dados_contagem in resultados_completos.items():
-                    f_out.write(f"\n--- Coluna: {coluna} ---\n") # Linha de subtítulo
+                    writer.writerow([]); writer.writerow([f"--- Coluna: {coluna} ---"]) # Linha de subtítulo
                     df_formatado = formatar_tabela_analise(dados_contagem, top_n)
 
                     if df_formatado is not None:
-                        # Escreve o DataFrame formatado no CSV
-                        # O cabeçalho só é escrito implicitamente se mode='w' e header=True
-                        # Como estamos escrevendo manualmente títulos e subtítulos,
-                        # controlamos o cabeçalho do DF aqui.
-                        header_df = True # Sempre escreve o cabeçalho do DF formatado
-                        df_formatado.to_csv(
-                            f_out,
-                            sep=';',
-                            index=False,
-                            header=header_df,
-                            line_terminator='\n' # Pode usar se Pandas >= 0.24.0
-                        )
-                        primeira_tabela = False # Flag não tão relevante aqui
+                        # Cabeçalho + linhas do DataFrame formatado
+                        writer.writerow(df_formatado.columns.tolist())
+                        writer.writerows(df_formatado.itertuples(index=False, name=None))
                     else:
-                        f_out.write("(Nenhum dado)\n")
-                f_out.write("\n") # Linha extra entre contextos
+                        writer.writerow(["(Nenhum dado)"])
+                writer.writerow([]) # Linha extra entre contextos
 
         logger.info(f"Análise exportada com sucesso para: {arquivo_saida_csv.name}")
 
@@ -149,6 +124,21 @@ def exportar_analises_csv(
         logger.error(f"Erro ao exportar análise para CSV: {e}", exc_info=True)
 
 
+@lru_cache(maxsize=1)
+def _localizar_fonte_dejavu() -> Path | None:
+    """
+    Procura 'DejaVuSans.ttf' uma única vez por execução (o aviso de ausência também sai uma vez só).
+
+    O fpdf2 só aceita o caminho da fonte (não bytes) e cada documento mantém o próprio
+    subconjunto de glifos, então o que se reaproveita entre exportações é a busca do arquivo.
+    """
+    font_path = Path("DejaVuSans.ttf") # Procura no diretório atual
+    if font_path.exists():
+        return font_path.resolve()
+    logger.warning("Arquivo de fonte 'DejaVuSans.ttf' não encontrado. Usando fonte padrão 'helvetica' para PDF (pode haver problemas com acentos/caracteres especiais).")
+    return None
+
+
 class PDFReport(FPDF):
     """Classe customizada para adicionar cabeçalho/rodapé se necessário (opcional)"""
     def header(self):
@@ -196,22 +186,25 @@ class PDFReport(FPDF):
 
         # Desenha linhas de dados
         self.set_font('helvetica', '', 8) # Fonte para os dados
-        for index, row in df_tabela.iterrows():
+        # Larguras/alinhamentos calculados uma vez e métodos ligados a locais (laço por célula)
+        larguras = [col_widths[col_name] for col_name in df_tabela.columns]
+        alinhamentos = ['L' if col_name == 'Item' else 'R' for col_name in df_tabela.columns] # Alinha números à direita
+        cell = self.cell; ln = self.ln; get_y = self.get_y; limite_pagina = self.page_break_trigger
+        for row in df_tabela.itertuples(index=False, name=None): # Tuplas simples: sem Series por linha
             # Verifica se precisa de nova página ANTES de desenhar a linha
-            if self.get_y() + line_height > self.page_break_trigger:
+            if get_y() + line_height > limite_pagina:
                 self.add_page(self.cur_orientation)
                 # Redesenha cabeçalho na nova página (opcional, mas bom para tabelas longas)
                 self.set_font('helvetica', 'B', 9)
                 for col_name_hdr in df_tabela.columns:
-                    self.cell(col_widths[col_name_hdr], line_height, col_name_hdr, border=1, align='C')
-                self.ln(line_height)
+                    cell(col_widths[col_name_hdr], line_height, col_name_hdr, border=1, align='C')
+                ln(line_height)
                 self.set_font('helvetica', '', 8)
 
             # Desenha células da linha atual
-            for col_name in df_tabela.columns:
-                 align = 'L' if col_name == 'Item' else 'R' # Alinha números à direita
-                 self.cell(col_widths[col_name], line_height, str(row[col_name]), border=1, align=align)
-            self.ln(line_height)
+            for largura, align, valor in zip(larguras, alinhamentos, row):
+                 cell(largura, line_height, str(valor), border=1, align=align)
+            ln(line_height)
         self.ln(4) # Espaço após a tabela
 
 
@@ -244,13 +237,12 @@ def exportar_analises_pdf(
             # Tenta adicionar a fonte DejaVu (requer arquivo .ttf)
             # Se o arquivo não for encontrado, ele usará a fonte padrão 'helvetica'
             # que pode não renderizar todos os caracteres corretamente.
-            font_path = Path("DejaVuSans.ttf") # Procura no diretório atual
-            if font_path.exists():
-                pdf.add_font('DejaVu', '', font_path, uni=True)
+            font_path = _localizar_fonte_dejavu() # Busca em cache (uma vez por execução)
+            if font_path is not None:
+                pdf.add_font('DejaVu', '', font_path) # uni=True é obsoleto no fpdf2 (TTF sempre Unicode, embutido como subconjunto)
                 pdf.set_font('DejaVu', size=10)
                 logger.info("Usando fonte DejaVuSans para PDF (suporte UTF-8).")
             else:
-                logger.warning("Arquivo de fonte 'DejaVuSans.ttf' não encontrado. Usando fonte padrão 'helvetica' para PDF (pode haver problemas com acentos/caracteres especiais).")
                 pdf.set_font('helvetica', size=10)
         except Exception as font_err:
              logger.warning(f"Erro ao carregar fonte DejaVu: {font_err}. Usando fonte padrão 'helvetica'.")
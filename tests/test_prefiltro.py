@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Pré-filtro de bytes do main.py (python -m unittest discover tests)."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import main
+
+
+class TestPrefiltrarBytes(unittest.TestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+        self.limite_original = main.LIMITE_PREFILTRO
+        main.LIMITE_PREFILTRO = 1.0 # Arquivos pequenos: não desistir pela fração mantida
+        self.addCleanup(setattr, main, 'LIMITE_PREFILTRO', self.limite_original)
+
+    def _csv(self, conteudo: bytes) -> Path:
+        caminho = Path(self.pasta.name) / 'dados.csv'
+        caminho.write_bytes(conteudo)
+        return caminho
+
+    def test_mantem_apenas_linhas_com_codigo(self):
+        caminho = self._csv(b'id;assuntos;texto\n1;{12486};a\n2;{9196};b\n3;{012491,7};c\n')
+        filtrado = pd.read_csv(main._prefiltrar_bytes(caminho, {12486, 12491}), sep=';', dtype=str)
+        self.assertEqual(filtrado['id'].tolist(), ['1', '3'])
+
+    def test_campo_entre_aspas_com_quebra_de_linha_desiste(self):
+        # Cortar por linha física juntaria o registro 1 com o 2 (campo texto corrompido)
+        caminho = self._csv(b'id;assuntos;texto\n1;{12486};"linha1\nlinha2"\n2;{9196};"tem 12486\nno texto"\n')
+        self.assertIsNone(main._prefiltrar_bytes(caminho, {12486}))
+
+    def test_aspas_na_mesma_linha_nao_impedem_o_prefiltro(self):
+        caminho = self._csv(b'id;assuntos;texto\n1;{12486};"com ""aspas"" e ;"\n2;{9196};"outro"\n')
+        filtrado = pd.read_csv(main._prefiltrar_bytes(caminho, {12486}), sep=';', dtype=str)
+        self.assertEqual(filtrado['texto'].tolist(), ['com "aspas" e ;'])
+
+
+if __name__ == '__main__':
+    unittest.main()